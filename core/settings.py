@@ -137,6 +137,40 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Nota mínima de aprovação: abaixo dela o aluno é sinalizado com "atenção"
+# nos relatórios e gráficos de desempenho
+NOTA_MINIMA_APROVACAO = 70
+
+# Renderização de PDFs (school/utils/pdf.py): processos dedicados com o
+# WeasyPrint já carregado. PDF_WORKERS = 0 renderiza no próprio processo.
+PDF_WORKERS = 2
+# Segundos que uma requisição espera pelo PDF (fila + renderização)
+PDF_TIMEOUT = 30
+# PDFs aguardando além dos que estão em renderização; acima disso a view responde 503
+PDF_FILA_MAXIMA = 8
+# Inicia os processos junto com o Django em vez de no primeiro PDF
+PDF_AQUECER = False
+# Cache dos PDFs gerados em MEDIA_ROOT/PDF_CACHE_DIR, limitado a
+# PDF_CACHE_TAMANHO_MAXIMO bytes (0 desliga o cache)
+PDF_CACHE_DIR = 'pdf_cache'
+PDF_CACHE_TAMANHO_MAXIMO = 200 * 1024 * 1024
+
+# Fila de jobs em segundo plano (python manage.py run_workers): threads por
+# processo worker, tentativas por job, espera base entre tentativas (dobra a
+# cada falha) e tempo sem atualização para considerar um job travado (segundos)
+JOB_WORKERS = 2
+JOB_MAX_TENTATIVAS = 3
+JOB_ESPERA_BASE = 30
+JOB_TEMPO_LIMITE = 3600
+# Segundos sem novas edições antes de gerar o documento do planejamento semanal
+PLANEJAMENTO_ESPERA = 10
+# Gráficos de desempenho mantidos em memória por processo (school/utils/graphs.py)
+GRAFICOS_CACHE_MAXIMO = 128
+# ReportLab, matplotlib, NumPy (e WeasyPrint com PDF_WORKERS = 0) são
+# importados no primeiro uso; True importa tudo já na inicialização, para
+# workers que vão gerar relatórios (ver school/utils/aquecimento.py)
+AQUECER_BIBLIOTECAS = False
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
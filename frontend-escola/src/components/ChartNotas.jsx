@@ -0,0 +1,70 @@
+import React, { useState, useEffect } from 'react'
+import api from '../services/api' // Nosso axios configurado
+
+// Gráfico de barras desenhado no navegador a partir das séries do backend:
+//   /api/graficos/aluno/<id>/      notas do aluno por matéria e bimestre
+//   /api/graficos/turma/<id>/      média de cada aluno da turma (?nota_minima=)
+//   /api/graficos/disciplina/<id>/ média de cada aluno na disciplina
+// Resposta: { titulo, eixo_y, ylim: [min, max], labels, valores, atencao }
+// (atencao[i] marca a barra em vermelho, como nos gráficos do Django)
+
+const LARGURA = 640
+const ALTURA = 320
+const MARGEM = { topo: 30, direita: 10, base: 90, esquerda: 40 }
+
+const ChartNotas = ({ url }) => {
+  const [dados, setDados] = useState(null)
+  const [error, setError] = useState('')
+
+  useEffect(() => {
+    const fetchDados = async () => {
+      try {
+        const response = await api.get(url)
+        setDados(response.data)
+        setError('')
+      } catch (err) {
+        setError('Não foi possível carregar o gráfico.')
+        console.error(err)
+      }
+    }
+
+    fetchDados()
+  }, [url])
+
+  if (error) return <div style={{ color: 'red' }}>{error}</div>
+  if (!dados) return <div>Carregando gráfico...</div>
+  if (dados.valores.length === 0) return <p>Nenhuma nota encontrada.</p>
+
+  const [minimo, maximo] = dados.ylim
+  const areaLargura = LARGURA - MARGEM.esquerda - MARGEM.direita
+  const areaAltura = ALTURA - MARGEM.topo - MARGEM.base
+  const passo = areaLargura / dados.valores.length
+  const y = (valor) => MARGEM.topo + areaAltura * (1 - (valor - minimo) / (maximo - minimo))
+
+  return (
+    <svg viewBox={`0 0 ${LARGURA} ${ALTURA}`} width="100%" role="img" aria-label={dados.titulo}>
+      <text x={LARGURA / 2} y={18} textAnchor="middle" fontWeight="bold">{dados.titulo}</text>
+      <text x={12} y={MARGEM.topo + areaAltura / 2} transform={`rotate(-90 12 ${MARGEM.topo + areaAltura / 2})`} textAnchor="middle" fontSize="12">
+        {dados.eixo_y}
+      </text>
+      <line x1={MARGEM.esquerda} y1={y(minimo)} x2={LARGURA - MARGEM.direita} y2={y(minimo)} stroke="#444" />
+      {dados.valores.map((valor, i) => {
+        const x = MARGEM.esquerda + i * passo
+        const topo = y(Math.min(Math.max(valor, minimo), maximo))
+        return (
+          <g key={i}>
+            <rect x={x + passo * 0.1} y={topo} width={passo * 0.8} height={y(minimo) - topo} fill={dados.atencao[i] ? 'red' : 'skyblue'}>
+              <title>{`${dados.labels[i]}: ${valor}`}</title>
+            </rect>
+            <text x={x + passo / 2} y={topo - 4} textAnchor="middle" fontSize="11">{Math.round(valor)}</text>
+            <text x={x + passo / 2} y={y(minimo) + 12} transform={`rotate(45 ${x + passo / 2} ${y(minimo) + 12})`} fontSize="10">
+              {dados.labels[i]}
+            </text>
+          </g>
+        )
+      })}
+    </svg>
+  )
+}
+
+export default ChartNotas
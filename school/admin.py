@@ -6,11 +6,8 @@ from django.utils.safestring import mark_safe
 from django.utils.html import format_html
 from datetime import datetime
 from django.db import transaction
-from django.db.models import F
-from django.http import HttpResponseRedirect, HttpResponse
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from weasyprint import HTML 
+from django.db.models import F, OuterRef, Subquery
+from django.http import HttpResponseRedirect, HttpResponse, StreamingHttpResponse
 import csv
 from django import forms
 from django.utils import timezone
@@ -20,9 +17,12 @@ from datetime import datetime as dt
 from .models import (
     Turmas, Aluno, Materia, Nota, AlunoNotas, Recurso, Emprestimo,
     Responsavel, Falta, Advertencia, Material, MaterialMovimentacao, Suspensao,
-    Professor, Contrato, Sala, Reserva, PlanejamentoSemanal
+    Professor, Contrato, Sala, Reserva, PlanejamentoSemanal, PeriodoLetivo, DesempenhoResumo, Job
 )
-from .admin_attendance import AttendanceDateAdmin 
+from .admin_attendance import AttendanceDateAdmin
+from .utils.advertencias import enviar_advertencias
+from .utils.chamada import salvar_chamada
+from .utils.contratos import alunos_para_contratos, zip_contratos
 
 # 🚨 IMPORTAÇÕES DAS VIEWS REFATORADAS (Devem existir em views_academico.py)
 from .views_academico import (
@@ -39,6 +39,13 @@ notas_por_aluno_select_turma_alias = notas_por_aluno_select_turma
 # --- 1. DEFINIÇÕES DAS CLASSES ADMIN ---
 # ---------------------------------------------------------------------
 
+def resposta_zip_contratos(alunos, filename='contratos.zip'):
+    """ZIP com os contratos dos alunos, enviado ao navegador à medida que cada PDF fica pronto."""
+    response = StreamingHttpResponse(zip_contratos(alunos_para_contratos(alunos)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 class NotasPorAlunoRedirectAdmin(admin.ModelAdmin):
     """Redireciona para o fluxo customizado de notas por aluno/turma."""
     def changelist_view(self, request, extra_context=None):
@@ -58,26 +65,20 @@ class AdvertenciaAdmin(admin.ModelAdmin):
     ver_pdf_link.short_description = "Ver PDF"
     
     def gerar_e_enviar_documento(self, request, queryset):
-        for advertencia in queryset:
-            html_string = render_to_string('school/documentoadvertencia_pdf.html', {'advertencia': advertencia})
-            pdf = HTML(string=html_string).write_pdf()
-            
-            responsavel = advertencia.aluno.responsavel
-            if not responsavel or not responsavel.email:
-                self.message_user(request, f"Erro: Não há e-mail para o responsável de {advertencia.aluno.complet_name_aluno}.", level='ERROR')
-                continue
-            
-            subject = f"Documento de Advertência - {advertencia.aluno.complet_name_aluno}"
-            body = f"Prezado(a) {responsavel.complet_name},\n\n[Mensagem...] Data de emissão: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n\nAtenciosamente,\nEquipe Escolar"
-            from_email = "seuemail@exemplo.com"
-            to_email = [responsavel.email]
-
-            try:
-                send_mail(subject, body, from_email, to_email, fail_silently=False, attachments=[('advertencia.pdf', pdf, 'application/pdf')])
-            except Exception as e:
-                self.message_user(request, f"Erro ao enviar e-mail para {responsavel.email}: {str(e)}", level='ERROR')
-                continue
-        self.message_user(request, "Documentos gerados e enviados com sucesso.")
+        advertencias = queryset.select_related('aluno__responsavel', 'aluno__class_choices').order_by('aluno__complet_name_aluno', 'data')
+        resultados = enviar_advertencias(advertencias)
+        enviados = sum(1 for resultado in resultados if resultado.enviado)
+        if enviados:
+            self.message_user(request, f"{enviados} documento(s) gerado(s) e enviado(s) com sucesso.")
+        if enviados < len(resultados):
+            self.message_user(request, f"{len(resultados) - enviados} documento(s) não enviado(s); veja os detalhes abaixo.", level='ERROR')
+        return render(request, 'admin/advertencia_envio_resultado.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Envio de documentos de advertência',
+            'resultados': resultados,
+            'enviados': enviados,
+            'opts': self.model._meta,
+        })
     gerar_e_enviar_documento.short_description = "Gerar e Enviar Documento de Advertência"
 
 
@@ -94,11 +95,32 @@ class ResponsaveisAdmin(admin.ModelAdmin):
 
 class AlunoAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'complet_name_aluno', 'responsavel', 'class_choices',
+        'id', 'complet_name_aluno', 'responsavel', 'class_choices', 'media_geral',
         'contrato_pdf_link', 'boletim_link', 'grafico_link', 'faltas_pdf_link'
     )
     list_display_links = ('complet_name_aluno',)
     search_fields = ('complet_name_aluno',)
+    # Filtrar pela turma e "selecionar todos" gera os contratos da turma inteira
+    list_filter = ('class_choices',)
+    actions = ['gerar_contratos_zip']
+
+    def get_queryset(self, request):
+        # Média geral vinda do resumo de desempenho na própria consulta da lista
+        # (ordenável pelo banco, sem uma agregação por linha)
+        return super().get_queryset(request).annotate(media_geral=Subquery(
+            DesempenhoResumo.objects
+            .filter(aluno=OuterRef('pk'), materia__isnull=True, bimestre__isnull=True)
+            .values('media')[:1]
+        ))
+
+    def media_geral(self, obj):
+        return obj.media_geral if obj.media_geral is not None else "-"
+    media_geral.short_description = "Média geral"
+    media_geral.admin_order_field = 'media_geral'
+
+    def gerar_contratos_zip(self, request, queryset):
+        return resposta_zip_contratos(queryset.values('id'))
+    gerar_contratos_zip.short_description = "Gerar contratos dos alunos selecionados (ZIP)"
     
     def contrato_pdf_link(self, obj):
         if obj.id:
@@ -130,7 +152,7 @@ class AlunoAdmin(admin.ModelAdmin):
 
 
 class TurmasAdmin(admin.ModelAdmin):
-    list_display = ('id', 'class_name', 'itinerary_name', 'relatorio_link', 'chamada_link', 'relatorio_faltas_link', 'relatorio_presenca_link')
+    list_display = ('id', 'class_name', 'itinerary_name', 'relatorio_link', 'chamada_link', 'relatorio_faltas_link', 'relatorio_presenca_link', 'boletins_link')
     search_fields = ('class_name', 'itinerary_name')
     list_filter = ('class_name', 'itinerary_name')
 
@@ -166,18 +188,18 @@ class TurmasAdmin(admin.ModelAdmin):
                 messages.error(request, "Só são aceitas as letras 'P' para Presente e 'F' para Falta. Corrija os valores informados.")
                 return redirect(request.path_info)
             else:
+                status_por_aluno = {}
                 for aluno in alunos:
                     status = request.POST.get(f'status_{aluno.id}')
                     if status in ['P', 'F']:
-                        Falta.objects.update_or_create(
-                            data=data_obj,
-                            turma=turma,
-                            aluno=aluno,
-                            # timezone.now() e request.user são imports globais
-                            defaults={'status': status, 'professor': request.user if request.user.is_staff else None} 
-                        )
-                messages.success(request, 'Chamada registrada com sucesso!')
-                return redirect('admin:school_turmas_changelist') 
+                        status_por_aluno[aluno.id] = status
+                # Uma transação por chamada: 1 SELECT + bulk_create/bulk_update
+                criados, atualizados = salvar_chamada(
+                    turma, data_obj, status_por_aluno,
+                    professor=request.user if request.user.is_staff else None,
+                )
+                messages.success(request, f'Chamada registrada com sucesso! {criados} registro(s) criado(s), {atualizados} atualizado(s).')
+                return redirect('admin:school_turmas_changelist')
             
         return render(request, 'admin/fazer_chamada.html', {
             'title': f'Chamada da turma {turma.class_name}',
@@ -212,6 +234,13 @@ class TurmasAdmin(admin.ModelAdmin):
         return "-"
     relatorio_faltas_link.short_description = "Relatório Faltas"
 
+    def boletins_link(self, obj):
+        if obj.id:
+            url = reverse('school:boletins_turma_pdf', args=[obj.id])
+            return format_html(f'<a href="{url}">🗂️ Boletins (ZIP)</a> | <a href="{url}?formato=pdf" target="_blank">PDF único</a>')
+        return "-"
+    boletins_link.short_description = "Boletins da Turma"
+
     def relatorio_presenca_link(self, obj):
         if obj.id:
             url = reverse('school:relatorio_presenca_pdf', args=[obj.id])
@@ -228,6 +257,30 @@ class TurmasAdmin(admin.ModelAdmin):
         return custom_urls + urls
 
 
+class PeriodoLetivoAdmin(admin.ModelAdmin):
+    list_display = ('ano', 'bimestre', 'data_inicio', 'data_fim')
+    list_filter = ('ano',)
+    ordering = ('-ano', 'bimestre')
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('tipo', 'status', 'progresso', 'tentativas', 'usuario', 'criado_em', 'concluido_em', 'download_link')
+    list_filter = ('status', 'tipo')
+    search_fields = ('chave',)
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        # Jobs são criados pelas views com ?async=1
+        return False
+
+    def download_link(self, obj):
+        if obj.status != Job.CONCLUIDO or not obj.arquivo:
+            return '-'
+        url = reverse('school:job_download', args=[obj.chave])
+        return format_html('<a href="{}">{}</a>', url, obj.nome_arquivo)
+    download_link.short_description = 'Resultado'
+
+
 class MateriaAdmin(admin.ModelAdmin):
     list_display= ('id', 'name_subject', 'grafico_link')
     search_fields= ('name_subject',)
@@ -248,6 +301,11 @@ class ContratoAdmin(admin.ModelAdmin):
     autocomplete_fields = ['aluno']
     readonly_fields = ()
     fields = ('aluno',)
+    actions = ['gerar_contratos_zip']
+
+    def gerar_contratos_zip(self, request, queryset):
+        return resposta_zip_contratos(queryset.values('aluno_id'))
+    gerar_contratos_zip.short_description = "Gerar contratos selecionados (ZIP)"
 
     def contrato_pdf_link(self, obj):
         if obj.aluno_id:
@@ -374,6 +432,8 @@ admin.site.register(Recurso, RecursoAdmin)
 admin.site.register(Emprestimo, EmprestimoAdmin)
 admin.site.register(Suspensao, SuspensaoAdmin)
 admin.site.register(Falta, AttendanceDateAdmin)
+admin.site.register(PeriodoLetivo, PeriodoLetivoAdmin)
+admin.site.register(Job, JobAdmin)
 
 # --- 3. CUSTOM URLS HOOK ---
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.shortcuts import render, redirect
 from django.urls import path
-from django.db.models import Count
+from django.db.models import Count, Q
 from django.utils.html import format_html
 from django.urls import reverse
 from django.http import HttpRequest
@@ -29,52 +29,88 @@ class AttendanceDateAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
     
+    # Quantidade de datas exibidas por página em attendance_by_date
+    datas_por_pagina = 30
+
     def attendance_by_date(self, request):
-        """Show list of unique dates with attendance records"""
-        dates = Falta.objects.values('data').distinct().order_by('-data')
-        
-        date_info = []
-        for date_dict in dates:
-            date = date_dict['data']
-            turmas_count = Falta.objects.filter(data=date).values('turma').distinct().count()
-            total_records = Falta.objects.filter(data=date).count()
-            
-            date_info.append({
-                'date': date,
-                'turmas_count': turmas_count,
-                'total_records': total_records,
-                'url': reverse('admin:attendance_date_detail', args=[date.strftime('%Y-%m-%d')])
-            })
-        
+        """Show list of unique dates with attendance records
+
+        Uma consulta agrupada por data traz turmas e registros de cada dia.
+        A paginação é por chave (?antes=AAAA-MM-DD): cada página busca as
+        datas anteriores à última exibida, então o custo não cresce com o
+        histórico de chamadas.
+        """
+        datas = Falta.objects.all()
+        antes = request.GET.get('antes')
+        if antes:
+            try:
+                datas = datas.filter(data__lt=datetime.strptime(antes, '%Y-%m-%d').date())
+            except ValueError:
+                antes = None
+
+        # Uma linha a mais que a página indica se existe uma próxima página
+        linhas = list(
+            datas.values('data')
+            .annotate(turmas_count=Count('turma', distinct=True), total_records=Count('id'))
+            .order_by('-data')[:self.datas_por_pagina + 1]
+        )
+        tem_proxima = len(linhas) > self.datas_por_pagina
+        linhas = linhas[:self.datas_por_pagina]
+
+        date_info = [
+            {
+                'date': linha['data'],
+                'turmas_count': linha['turmas_count'],
+                'total_records': linha['total_records'],
+                'url': reverse('admin:attendance_date_detail', args=[linha['data'].strftime('%Y-%m-%d')])
+            }
+            for linha in linhas
+        ]
+
+        proxima_pagina = None
+        if tem_proxima:
+            proxima_pagina = f"?antes={linhas[-1]['data'].strftime('%Y-%m-%d')}"
+
         context = {
             'title': 'Chamadas Realizadas',
             'dates': date_info,
+            'proxima_pagina': proxima_pagina,
+            'primeira_pagina': bool(antes),
             'opts': self.model._meta,
         }
         return render(request, 'admin/attendance_by_date.html', context)
     
     def attendance_date_detail(self, request, date):
-        """Show turmas for a specific date"""
+        """Show turmas for a specific date
+
+        Presentes, faltas e total de cada turma vêm de uma única consulta
+        agrupada por turma.
+        """
         date_obj = datetime.strptime(date, '%Y-%m-%d').date()
         formatted_date = date_obj.strftime('%d/%m/%Y')
         
-        turmas = Turmas.objects.filter(
-            faltas__data=date_obj
-        ).distinct()
+        # O filtro antes do annotate restringe as contagens às chamadas da data
+        turmas = (
+            Turmas.objects
+            .filter(faltas__data=date_obj)
+            .annotate(
+                total_alunos=Count('faltas'),
+                presentes=Count('faltas', filter=Q(faltas__status='P')),
+                n_faltas=Count('faltas', filter=Q(faltas__status='F')),
+            )
+            .order_by('id')
+        )
         
-        turma_info = []
-        for turma in turmas:
-            total_alunos = Falta.objects.filter(data=date_obj, turma=turma).count()
-            presentes = Falta.objects.filter(data=date_obj, turma=turma, status='P').count()
-            faltas = Falta.objects.filter(data=date_obj, turma=turma, status='F').count()
-            
-            turma_info.append({
+        turma_info = [
+            {
                 'turma': turma,
-                'total_alunos': total_alunos,
-                'presentes': presentes,
-                'faltas': faltas,
+                'total_alunos': turma.total_alunos,
+                'presentes': turma.presentes,
+                'faltas': turma.n_faltas,
                 'url': reverse('admin:attendance_turma_detail', args=[date, turma.id])
-            })
+            }
+            for turma in turmas
+        ]
         
         context = {
             'title': f'Chamada do dia {formatted_date}',
@@ -103,10 +139,12 @@ class AttendanceDateAdmin(admin.ModelAdmin):
             turma=turma
         ).select_related('aluno').order_by('aluno__complet_name_aluno')
         
-        # Calculate summary
-        total_alunos = attendance_records.count()
-        presentes = attendance_records.filter(status='P').count()
-        faltas = attendance_records.filter(status='F').count()
+        # Calculate summary (uma única agregação)
+        resumo = attendance_records.order_by().aggregate(
+            total_alunos=Count('id'),
+            presentes=Count('id', filter=Q(status='P')),
+            faltas=Count('id', filter=Q(status='F')),
+        )
         
         context = {
             'title': f'Chamada - {turma} - {formatted_date}',
@@ -114,11 +152,7 @@ class AttendanceDateAdmin(admin.ModelAdmin):
             'formatted_date': formatted_date,
             'turma': turma,
             'attendance_records': attendance_records,
-            'summary': {
-                'total_alunos': total_alunos,
-                'presentes': presentes,
-                'faltas': faltas,
-            },
+            'summary': resumo,
             'opts': self.model._meta,
             # REMOVIDO: 'back_url' do context (será gerado diretamente no template)
         }
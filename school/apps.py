@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 
@@ -8,3 +9,12 @@ class SchoolConfig(AppConfig):
 
     def ready(self):
         import school.signals
+        import school.tarefas
+
+        if getattr(settings, 'PDF_AQUECER', False):
+            from .utils.pdf import aquecer
+            aquecer()
+
+        if getattr(settings, 'AQUECER_BIBLIOTECAS', False):
+            from .utils.aquecimento import aquecer_bibliotecas
+            aquecer_bibliotecas()
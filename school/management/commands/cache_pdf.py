@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from school.utils.pdf import estatisticas_cache, limpar_cache
+
+
+class Command(BaseCommand):
+    help = 'Mostra o uso do cache de PDFs gerados (acertos, faltas, tamanho) ou o esvazia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limpar',
+            action='store_true',
+            help='Remove todos os PDFs do cache'
+        )
+
+    def handle(self, *args, **options):
+        if options['limpar']:
+            removidos = limpar_cache()
+            self.stdout.write(self.style.SUCCESS(f'Cache de PDFs esvaziado: {removidos} arquivo(s) removido(s).'))
+            return
+
+        dados = estatisticas_cache()
+        consultas = dados['acertos'] + dados['faltas']
+        taxa = f"{dados['acertos'] / consultas:.0%}" if consultas else '-'
+        self.stdout.write(f"Arquivos: {dados['arquivos']}")
+        self.stdout.write(f"Ocupado: {dados['bytes'] / 1024 / 1024:.1f} MB de {dados['tamanho_maximo'] / 1024 / 1024:.0f} MB")
+        self.stdout.write(f"Acertos: {dados['acertos']}  Faltas: {dados['faltas']}  Taxa de acerto: {taxa}")
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from school.models import Nota
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove notas duplicadas por (aluno, matéria, bimestre), mantendo o lançamento mais recente. '
+        'Rode antes de aplicar a migração da restrição única de Nota.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas informa quantas notas seriam removidas'
+        )
+
+    def handle(self, *args, **options):
+        # Numera os lançamentos de cada célula do mais recente ao mais antigo;
+        # tudo que não for o primeiro é duplicata. Notas sem bimestre não
+        # entram na restrição única e ficam como estão.
+        duplicadas = list(
+            Nota.objects
+            .filter(bimestre__isnull=False)
+            .annotate(ordem=Window(
+                RowNumber(),
+                partition_by=[F('aluno_id'), F('materia_id'), F('bimestre')],
+                order_by=[F('data_lancamento').desc(), F('id').desc()],
+            ))
+            .filter(ordem__gt=1)
+            .values_list('id', flat=True)
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(duplicadas)} nota(s) duplicada(s) seriam removidas.')
+            return
+
+        with transaction.atomic():
+            for inicio in range(0, len(duplicadas), 500):
+                Nota.objects.filter(id__in=duplicadas[inicio:inicio + 500]).delete()
+
+        self.stdout.write(self.style.SUCCESS(f'{len(duplicadas)} nota(s) duplicada(s) removida(s).'))
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school.models import Turmas
+from school.utils.boletins import boletins_turma, pdf_boletins, zip_boletins
+from school.utils.pdf import PDFIndisponivel
+
+
+class Command(BaseCommand):
+    help = 'Gera os boletins de todos os alunos de uma turma em um ZIP (um PDF por aluno) ou em um único PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('turma', type=int, help='ID da turma')
+        parser.add_argument(
+            '--bimestre',
+            type=int,
+            choices=[1, 2, 3, 4],
+            default=None,
+            help='Bimestre do boletim (padrão: todos os bimestres)'
+        )
+        parser.add_argument('--ano', type=int, default=None, help='Ano letivo (padrão: todas as notas)')
+        parser.add_argument(
+            '--formato',
+            choices=['zip', 'pdf'],
+            default='zip',
+            help='zip: um PDF por aluno (padrão); pdf: um único PDF com todos'
+        )
+        parser.add_argument('--saida', default=None, help='Arquivo de saída (padrão: boletins_turma_<id>.<formato>)')
+
+    def handle(self, *args, **options):
+        try:
+            turma = Turmas.objects.get(id=options['turma'])
+        except Turmas.DoesNotExist:
+            raise CommandError(f"Turma {options['turma']} não encontrada.")
+
+        formato = options['formato']
+        saida = options['saida'] or f'boletins_turma_{turma.id}.{formato}'
+        inicio = time.monotonic()
+
+        boletins = boletins_turma(turma.id, options['bimestre'], options['ano'])
+        if not boletins:
+            raise CommandError(f'A turma {turma} não tem alunos.')
+        self.stdout.write(f'Gerando {len(boletins)} boletim(ns) da turma {turma}...')
+
+        if formato == 'pdf':
+            try:
+                pdf = pdf_boletins(boletins)
+            except PDFIndisponivel as erro:
+                raise CommandError(str(erro))
+            with open(saida, 'wb') as arquivo:
+                arquivo.write(pdf)
+        else:
+            with open(saida, 'wb') as arquivo:
+                for parte in zip_boletins(boletins):
+                    arquivo.write(parte)
+
+        duracao = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f'Boletins gravados em {saida} ({duracao:.1f}s).'))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from school.utils.contratos import alunos_para_contratos, zip_contratos
+
+
+class Command(BaseCommand):
+    help = 'Gera os contratos dos alunos em um arquivo ZIP (um PDF por aluno) gravado em disco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turma', type=int, default=None, help='ID da turma (padrão: todas as turmas)')
+        parser.add_argument(
+            '--aluno',
+            type=int,
+            action='append',
+            default=None,
+            help='ID do aluno (pode repetir; padrão: todos os alunos)'
+        )
+        parser.add_argument('--saida', default='contratos.zip', help='Arquivo ZIP de saída (padrão: contratos.zip)')
+
+    def handle(self, *args, **options):
+        alunos = alunos_para_contratos(options['aluno'], options['turma'])
+        total = alunos.count()
+        if not total:
+            raise CommandError('Nenhum aluno encontrado.')
+        self.stdout.write(f'Gerando {total} contrato(s)...')
+
+        inicio = time.monotonic()
+        # Grava o ZIP parte a parte: só os PDFs em renderização ficam em memória
+        with open(options['saida'], 'wb') as arquivo:
+            for parte in zip_contratos(alunos):
+                arquivo.write(parte)
+
+        duracao = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(f"Contratos gravados em {options['saida']} ({duracao:.1f}s)."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from school.utils.desempenho import recalcular_desempenho
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo de desempenho (DesempenhoResumo) a partir das notas lançadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--aluno',
+            type=int,
+            action='append',
+            default=None,
+            help='ID do aluno a recalcular (pode repetir; padrão: todos os alunos)'
+        )
+
+    def handle(self, *args, **options):
+        alunos_ids = options['aluno']
+        alvo = f"aluno(s) {', '.join(map(str, alunos_ids))}" if alunos_ids else 'todos os alunos'
+        self.stdout.write(f'Recalculando resumo de desempenho para {alvo}...')
+
+        total = recalcular_desempenho(alunos_ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Resumo de desempenho reconstruído: {total} linha(s) gravada(s).'))
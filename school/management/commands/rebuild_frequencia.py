@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from school.utils.frequencia import recalcular_frequencia
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo de frequência (FrequenciaResumo) a partir das faltas registradas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--turma',
+            type=int,
+            default=None,
+            help='ID da turma a recalcular (padrão: todas as turmas)'
+        )
+
+    def handle(self, *args, **options):
+        turma_id = options['turma']
+        alvo = f'turma {turma_id}' if turma_id else 'todas as turmas'
+        self.stdout.write(f'Recalculando resumo de frequência para {alvo}...')
+
+        total = recalcular_frequencia(turma_id=turma_id)
+
+        self.stdout.write(self.style.SUCCESS(f'Resumo de frequência reconstruído: {total} linha(s) gravada(s).'))
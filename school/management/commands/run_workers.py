@@ -0,0 +1,99 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from school.utils.jobs import executar, manter_vivos, recuperar_travados, reservar
+
+
+def _executar_e_fechar(job):
+    # Cada thread tem a sua conexão com o banco: fecha ao terminar o job
+    try:
+        return executar(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Executa os jobs em segundo plano (relatórios pedidos com ?async=1)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=getattr(settings, 'JOB_WORKERS', 2),
+            help='Jobs executados ao mesmo tempo por este processo (padrão: JOB_WORKERS)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas à fila quando não há jobs (padrão: 2)'
+        )
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Executa os jobs disponíveis agora e termina (útil em cron)'
+        )
+
+    def handle(self, *args, **options):
+        threads = max(1, options['threads'])
+        identificador = f'{socket.gethostname()}:{os.getpid()}'
+        parar = threading.Event()
+
+        def encerrar(signum, frame):
+            self.stdout.write('Encerrando após os jobs em execução...')
+            parar.set()
+
+        signal.signal(signal.SIGTERM, encerrar)
+        signal.signal(signal.SIGINT, encerrar)
+
+        recuperados = recuperar_travados()
+        if recuperados:
+            self.stdout.write(self.style.WARNING(f'{recuperados} job(s) travado(s) devolvido(s) à fila.'))
+        self.stdout.write(f'Worker {identificador} com {threads} thread(s).')
+
+        concluidos = falhas = 0
+        ultima_recuperacao = time.monotonic()
+        em_execucao = {}
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='job') as executor:
+            while True:
+                # Preenche as threads livres com os próximos jobs da fila
+                while not parar.is_set() and len(em_execucao) < threads:
+                    close_old_connections()
+                    job = reservar(identificador)
+                    if job is None:
+                        break
+                    self.stdout.write(f'Iniciando {job.tipo} ({job.chave}), tentativa {job.tentativas}.')
+                    em_execucao[executor.submit(_executar_e_fechar, job)] = job
+
+                if not em_execucao and (parar.is_set() or options['uma_vez']):
+                    break
+
+                if em_execucao:
+                    prontos, _ = wait(em_execucao, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                else:
+                    parar.wait(options['intervalo'])
+                    prontos = ()
+
+                for future in prontos:
+                    job = em_execucao.pop(future)
+                    if future.result():
+                        concluidos += 1
+                        self.stdout.write(self.style.SUCCESS(f'Concluído {job.tipo} ({job.chave}).'))
+                    else:
+                        falhas += 1
+                        self.stdout.write(self.style.ERROR(f'Falhou {job.tipo} ({job.chave}).'))
+
+                if time.monotonic() - ultima_recuperacao > 60:
+                    manter_vivos(em_execucao.values())
+                    recuperar_travados()
+                    ultima_recuperacao = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS(f'Worker encerrado: {concluidos} job(s) concluído(s), {falhas} com falha.'))
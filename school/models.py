@@ -2,11 +2,15 @@ from django.db import models
 from .validators import validar_telefone, validar_cpf, validar_cpf_model
 from django.contrib.auth.models import User
 from datetime import datetime, timedelta
+import hashlib
+import json
 import os
+import uuid
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.db.models import F
+from django.utils import timezone
 
 # Função usada por migrations antigas para definir data fim padrão de suspensões
 def get_default_data_fim():
@@ -68,8 +72,9 @@ class Aluno(models.Model):
         return self.complet_name_aluno
 
     def media_notas(self):
-        # Calcula a média das notas do aluno usando agregação
-        return self.notas.aggregate(media=models.Avg('nota'))['media']
+        # Média geral do aluno, lida da linha geral do resumo de desempenho
+        # (DesempenhoResumo); None se o aluno ainda não tem notas
+        return self.desempenhos.filter(materia__isnull=True, bimestre__isnull=True).values_list('media', flat=True).first()
 
     def total_faltas(self):
         return self.faltas.filter(status='F').count()
@@ -80,8 +85,47 @@ class Aluno(models.Model):
 
 # Modelo para registrar faltas/presenças
 from django.conf import settings
-# Modelo para registrar faltas/presenças
 
+
+class PeriodoLetivo(models.Model):
+    """Calendário letivo: início e fim de cada bimestre de um ano.
+
+    Fonte de verdade para converter a data de uma chamada em (ano, bimestre)
+    — ver school/utils/periodos.py. Anos sem períodos cadastrados usam o
+    calendário padrão definido lá.
+    """
+    BIMESTRE_CHOICES = [
+        (1, '1º Bimestre'),
+        (2, '2º Bimestre'),
+        (3, '3º Bimestre'),
+        (4, '4º Bimestre'),
+    ]
+    ano = models.PositiveSmallIntegerField(verbose_name='Ano letivo')
+    bimestre = models.PositiveSmallIntegerField(choices=BIMESTRE_CHOICES, verbose_name='Bimestre')
+    data_inicio = models.DateField(verbose_name='Início')
+    data_fim = models.DateField(verbose_name='Fim')
+
+    class Meta:
+        unique_together = ('ano', 'bimestre')
+        ordering = ['data_inicio']
+        verbose_name = "Período Letivo"
+        verbose_name_plural = "Períodos Letivos"
+
+    def clean(self):
+        if self.data_inicio and self.data_fim:
+            if self.data_inicio > self.data_fim:
+                raise ValidationError("A data de início deve ser anterior à data de fim.")
+            sobrepostos = PeriodoLetivo.objects.filter(
+                data_inicio__lte=self.data_fim, data_fim__gte=self.data_inicio,
+            ).exclude(pk=self.pk)
+            if sobrepostos.exists():
+                raise ValidationError(f"O período se sobrepõe a {sobrepostos.first()}.")
+
+    def __str__(self):
+        return f"{self.bimestre}º bim/{self.ano} ({self.data_inicio:%d/%m} a {self.data_fim:%d/%m})"
+
+
+# Modelo para registrar faltas/presenças
 class Falta(models.Model):
     STATUS_CHOICES = (
         ('P', 'Presente'),
@@ -96,12 +140,79 @@ class Falta(models.Model):
 
     class Meta:
         unique_together = ('data', 'turma', 'aluno')
+        # Índices compostos para os acessos mais frequentes dos relatórios:
+        # faltas/presenças por turma ou aluno, chamadas de um aluno por período
+        # e datas distintas de chamada por turma.
+        indexes = [
+            models.Index(fields=['turma', 'status'], name='falta_turma_status_idx'),
+            models.Index(fields=['aluno', 'status'], name='falta_aluno_status_idx'),
+            models.Index(fields=['aluno', 'data'], name='falta_aluno_data_idx'),
+            models.Index(fields=['turma', 'data'], name='falta_turma_data_idx'),
+        ]
         verbose_name = "Falta"
         verbose_name_plural = "Faltas"
 
     def __str__(self):
         return f"{self.data} - {self.turma} - {self.aluno}: {self.get_status_display()}"
-    ''
+
+
+class FrequenciaResumo(models.Model):
+    """Totais de frequência por aluno/turma/ano letivo/bimestre, derivados de `Falta`.
+
+    Mantido por school/utils/frequencia.py (sinais de Falta e salvar_chamada)
+    e reconstruído por `python manage.py rebuild_frequencia`. Não editar à mão.
+    `total_aulas` é o número de datas distintas de chamada da turma no bimestre.
+    """
+    aluno = models.ForeignKey('Aluno', on_delete=models.CASCADE, related_name='frequencias')
+    turma = models.ForeignKey('Turmas', on_delete=models.CASCADE, related_name='frequencias')
+    # Ano e bimestre resolvidos pelo calendário letivo (PeriodoLetivo) a partir
+    # da data da chamada; bimestre nulo para datas fora dos bimestres (recesso)
+    ano = models.PositiveSmallIntegerField(verbose_name='Ano letivo')
+    bimestre = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Bimestre')
+    presencas = models.PositiveIntegerField(default=0)
+    faltas = models.PositiveIntegerField(default=0)
+    total_aulas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('aluno', 'turma', 'ano', 'bimestre')
+        verbose_name = "Resumo de Frequência"
+        verbose_name_plural = "Resumos de Frequência"
+
+    def __str__(self):
+        return f"{self.aluno} - {self.turma} - {self.bimestre}º bim/{self.ano}: {self.faltas} falta(s)"
+
+
+class DesempenhoResumo(models.Model):
+    """Média, menor nota e quantidade de notas por aluno/matéria/bimestre, derivadas de `Nota`.
+
+    Além das linhas por matéria e bimestre, cada aluno tem uma linha geral
+    (matéria e bimestre nulos) com a média de todas as notas. Mantido por
+    school/utils/desempenho.py (sinais de Nota e salvar_notas) e reconstruído
+    por `python manage.py rebuild_desempenho`. Não editar à mão.
+    """
+    aluno = models.ForeignKey('Aluno', on_delete=models.CASCADE, related_name='desempenhos')
+    # Matéria nula: linha geral do aluno
+    materia = models.ForeignKey('Materia', on_delete=models.CASCADE, null=True, blank=True, related_name='desempenhos')
+    bimestre = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name='Bimestre')
+    media = models.DecimalField(max_digits=5, decimal_places=2)
+    min_nota = models.DecimalField(max_digits=5, decimal_places=2)
+    n_notas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('aluno', 'materia', 'bimestre')
+        # Ordenar/filtrar alunos por média em uma matéria/bimestre (ou na linha geral)
+        indexes = [
+            models.Index(fields=['materia', 'bimestre', 'media'], name='desempenho_materia_media_idx'),
+        ]
+        verbose_name = "Resumo de Desempenho"
+        verbose_name_plural = "Resumos de Desempenho"
+
+    def __str__(self):
+        if self.materia_id is None:
+            return f"{self.aluno} - geral: {self.media}"
+        return f"{self.aluno} - {self.materia} - {self.bimestre}º bim: {self.media}"
+
+
 class Advertencia(models.Model):
     aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name="advertencias")
     data = models.DateField()
@@ -252,6 +363,16 @@ class Nota(models.Model):
     
     
     class Meta:
+        # Uma nota por aluno, matéria e bimestre; o índice da restrição também
+        # atende as buscas por aluno. Antes de migrar bases antigas, rode
+        # `python manage.py deduplicar_notas`.
+        constraints = [
+            models.UniqueConstraint(fields=['aluno', 'materia', 'bimestre'], name='nota_aluno_materia_bimestre_uniq'),
+        ]
+        # Notas de um aluno por período de lançamento (ano letivo)
+        indexes = [
+            models.Index(fields=['aluno', 'data_lancamento'], name='nota_aluno_data_idx'),
+        ]
         verbose_name = "Nota"
         verbose_name_plural = "Nota"
 
@@ -513,29 +634,47 @@ class PlanejamentoSemanal(models.Model):
             weekday = self.semana_inicio.weekday()  # Monday == 0
             if weekday != 0:
                 self.semana_inicio = self.semana_inicio - timedelta(days=weekday)
+        # O documento não é gerado aqui: os sinais agendam a geração após o
+        # commit (ver school/utils/planejamentos.py), já com os itens gravados
         super().save(*args, **kwargs)
-        # após salvar, gere o PDF/HTML com o planejamento
-        try:
-            self.generate_planejamento_document()
-        except Exception:
-            # não bloquear o save em caso de erro na geração do documento
-            pass
 
     arquivo_pdf = models.FileField(upload_to='planejamentos_pdf/', null=True, blank=True)
-
-    def generate_planejamento_document(self):
+    # Impressão digital do conteúdo usado para gerar `arquivo_pdf`
+    documento_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    DIAS_SEMANA = ('segunda', 'terca', 'quarta', 'quinta', 'sexta')
+
+    def impressao_digital(self, itens):
+        """Hash do conteúdo exibido no documento (campos dos dias e itens)."""
+        conteudo = [
+            str(self.professor), str(self.semana_inicio),
+            [getattr(self, dia) or '' for dia in self.DIAS_SEMANA],
+            [
+                (item.dia, item.ordem, item.materia.name_subject if item.materia else '', item.conteudo or '')
+                for item in itens
+            ],
+        ]
+        return hashlib.sha256(json.dumps(conteudo, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def generate_planejamento_document(self, forcar=False):
         """Gera um documento (PDF quando possível) representando o quadro semanal.
 
         Tenta usar WeasyPrint para gerar PDF; se não disponível, salva um arquivo HTML.
+        Só gera quando o conteúdo mudou desde o último documento (ou com
+        forcar=True). Retorna True se um novo documento foi gravado.
         """
         from django.core.files.base import ContentFile
-        from django.core.files.storage import default_storage
         from django.utils.html import escape
 
         # coletar itens por dia e ordem
-        dias = ['segunda', 'terca', 'quarta', 'quinta', 'sexta']
+        dias = list(self.DIAS_SEMANA)
+        itens = sorted(self.itens.select_related('materia'), key=lambda it: (dias.index(it.dia), it.ordem, it.pk))
+        digital = self.impressao_digital(itens)
+        if not forcar and self.arquivo_pdf and digital == self.documento_hash:
+            return False
+
         items_by_day = {d: [] for d in dias}
-        for item in self.itens.order_by('dia', 'ordem'):
+        for item in itens:
             items_by_day[item.dia].append(item)
 
         # calcular máximo de linhas (ordens) para montar a tabela
@@ -552,6 +691,14 @@ class PlanejamentoSemanal(models.Model):
             html.append(f'<th>{label}</th>')
         html.append('</tr>')
 
+        # texto livre de cada dia (campos segunda->sexta), quando preenchido
+        if any(getattr(self, d) for d in dias):
+            html.append('<tr>')
+            for d in dias:
+                texto = escape(getattr(self, d) or '').replace('\n', '<br>')
+                html.append(f'<td>{texto}</td>')
+            html.append('</tr>')
+
         for row in range(max_rows):
             html.append('<tr>')
             for d in dias:
@@ -567,20 +714,28 @@ class PlanejamentoSemanal(models.Model):
         html.append('</table></body></html>')
         html_str = '\n'.join(html)
 
-        # tentar gerar PDF via weasyprint
+        # tentar gerar PDF via serviço de renderização (WeasyPrint)
         try:
-            from weasyprint import HTML
-            pdf_bytes = HTML(string=html_str).write_pdf()
+            from .utils.pdf import renderizar_pdf
+            conteudo = renderizar_pdf(html_str)
             filename = f'planejamento_{self.pk}.pdf'
-            self.arquivo_pdf.save(filename, ContentFile(pdf_bytes), save=False)
-            super().save(update_fields=['arquivo_pdf'])
-            return
         except Exception:
             # fallback: salvar HTML
+            conteudo = html_str.encode('utf-8')
             filename = f'planejamento_{self.pk}.html'
-            self.arquivo_pdf.save(filename, ContentFile(html_str.encode('utf-8')), save=False)
-            super().save(update_fields=['arquivo_pdf'])
-        
+
+        anterior = self.arquivo_pdf.name
+        self.arquivo_pdf.save(filename, ContentFile(conteudo), save=False)
+        self.documento_hash = digital
+        # update() em vez de save(): não dispara os sinais (que agendariam outra
+        # geração) nem altera atualizado_em
+        PlanejamentoSemanal.objects.filter(pk=self.pk).update(
+            arquivo_pdf=self.arquivo_pdf.name, documento_hash=digital,
+        )
+        if anterior and anterior != self.arquivo_pdf.name:
+            self.arquivo_pdf.storage.delete(anterior)
+        return True
+
 
 class PlanejamentoItem(models.Model):
     DIAS = (
@@ -737,4 +892,64 @@ class Notificacao(models.Model):
         verbose_name_plural = "Notificações"
         ordering = ['-data_criacao']
         # 🚨 APAGUE QUALQUER LINHA unique_together QUE ESTIVER AQUI.
-        # EX: SE ESTIVER 'unique_together = (('aluno', 'evento'),)', REMOVA!
\ No newline at end of file
+        # EX: SE ESTIVER 'unique_together = (('aluno', 'evento'),)', REMOVA!
+
+
+def _caminho_resultado_job(instance, filename):
+    return f'jobs/{instance.chave}/{filename}'
+
+
+class Job(models.Model):
+    """Tarefa em segundo plano (relatórios pesados, lotes de PDFs).
+
+    Criada por `school.utils.jobs.enfileirar` (views com ?async=1) e
+    executada pelo comando `python manage.py run_workers`. O resultado fica
+    em `arquivo`; o andamento é consultado em jobs/<chave>/.
+    """
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDO = 'concluido'
+    ERRO = 'erro'
+    STATUS_CHOICES = (
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDO, 'Concluído'),
+        (ERRO, 'Erro'),
+    )
+
+    # Identificador público (URLs de consulta e download)
+    chave = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    tipo = models.CharField(max_length=50, verbose_name='Tipo de tarefa')
+    parametros = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDENTE)
+    progresso = models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')
+    mensagem = models.TextField(blank=True, default='')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    max_tentativas = models.PositiveSmallIntegerField(default=3)
+    # Só é reservado a partir deste momento (espera entre tentativas)
+    disponivel_em = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True, default='')
+    arquivo = models.FileField(upload_to=_caminho_resultado_job, null=True, blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+    # Atualizado a cada progresso: jobs "executando" parados há muito tempo voltam para a fila
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Próximo job da fila: status pendente com disponivel_em vencido
+            models.Index(fields=['status', 'disponivel_em'], name='job_fila_idx'),
+        ]
+        ordering = ['-criado_em']
+        verbose_name = 'Tarefa em segundo plano'
+        verbose_name_plural = 'Tarefas em segundo plano'
+
+    def __str__(self):
+        return f'{self.tipo} ({self.get_status_display()}, {self.progresso}%)'
+
+    @property
+    def nome_arquivo(self):
+        return os.path.basename(self.arquivo.name) if self.arquivo else ''
+
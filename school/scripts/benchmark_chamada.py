@@ -0,0 +1,69 @@
+"""
+Benchmark de consultas por chamada (TurmasAdmin.fazer_chamada).
+
+Compara o caminho antigo (update_or_create por aluno) com salvar_chamada,
+contando as consultas SQL de uma chamada completa. Tudo roda dentro de uma
+transação desfeita ao final, então o banco não é alterado.
+
+Uso:
+    python manage.py shell < school/scripts/benchmark_chamada.py
+"""
+import time
+from datetime import date
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from school.models import Aluno, Falta, Responsavel, Turmas
+from school.utils.chamada import salvar_chamada
+
+N_ALUNOS = 40
+
+
+class _Rollback(Exception):
+    pass
+
+
+def chamada_antiga(turma, data, status_por_aluno):
+    for aluno_id, status in status_por_aluno.items():
+        Falta.objects.update_or_create(
+            data=data, turma=turma, aluno_id=aluno_id,
+            defaults={'status': status, 'professor': None},
+        )
+
+
+def medir(nome, funcao):
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        funcao()
+        duracao = (time.perf_counter() - inicio) * 1000
+    print(f'{nome:<40} {len(ctx.captured_queries):>5} consultas  {duracao:8.1f} ms')
+
+
+try:
+    with transaction.atomic():
+        turma = Turmas.objects.create(class_name='1°', itinerary_name='N', godfather_prof='-', class_representante='-')
+        responsavel = Responsavel.objects.create(
+            complet_name='Benchmark', phone_number='11999999999', email='bench@exemplo.com',
+            cpf='00000000191', birthday=date(1980, 1, 1),
+        )
+        alunos = Aluno.objects.bulk_create([
+            Aluno(
+                complet_name_aluno=f'Aluno {i}', responsavel=responsavel, phone_number_aluno='11999999999',
+                matricula_aluno=str(i), email_aluno='aluno@exemplo.com', cpf_aluno=f'bench{i:06d}',
+                birthday_aluno=date(2008, 1, 1), class_choices=turma,
+            )
+            for i in range(N_ALUNOS)
+        ])
+        ids = [a.id for a in Aluno.objects.filter(class_choices=turma)]
+        presencas = {aluno_id: 'P' for aluno_id in ids}
+        faltas = {aluno_id: ('F' if i % 4 == 0 else 'P') for i, aluno_id in enumerate(ids)}
+
+        print(f'Chamada de {N_ALUNOS} alunos')
+        medir('antigo: primeira chamada', lambda: chamada_antiga(turma, date(2025, 3, 3), presencas))
+        medir('antigo: regravação com alterações', lambda: chamada_antiga(turma, date(2025, 3, 3), faltas))
+        medir('salvar_chamada: primeira chamada', lambda: salvar_chamada(turma, date(2025, 3, 4), presencas))
+        medir('salvar_chamada: regravação com alterações', lambda: salvar_chamada(turma, date(2025, 3, 4), faltas))
+        raise _Rollback
+except _Rollback:
+    pass
@@ -0,0 +1,44 @@
+"""
+Benchmark do motor de estatísticas de notas (views_analytics).
+
+Mede `calcular_estatisticas` sobre arrays sintéticos de 100 mil e 1 milhão
+de notas e confere o resultado contra NumPy calculado grupo a grupo. Em
+seguida mede `estatisticas_notas` (consulta + cálculo) sobre as notas do
+banco. Não grava nada.
+
+Uso:
+    python manage.py shell < school/scripts/benchmark_estatisticas.py
+"""
+import time
+
+import numpy as np
+
+from school.views_analytics import PERCENTIS, calcular_estatisticas, estatisticas_notas
+
+
+def medir(nome, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f'{nome:<50} {(time.perf_counter() - inicio) * 1000:8.1f} ms')
+    return resultado
+
+
+gerador = np.random.default_rng(42)
+for n_notas in (100_000, 1_000_000):
+    grupos = gerador.integers(1, 200, n_notas)
+    bimestres = gerador.integers(0, 5, n_notas)
+    valores = np.round(gerador.uniform(0, 100, n_notas), 2)
+    resultado = medir(f'calcular_estatisticas: {n_notas} notas, 199 grupos',
+                      lambda: calcular_estatisticas(grupos, bimestres, valores))
+
+    # Conferência contra NumPy grupo a grupo
+    for i, chave in enumerate(resultado['chaves'][:20]):
+        notas_grupo = valores[grupos == chave]
+        assert np.isclose(resultado['media'][i], notas_grupo.mean())
+        assert np.isclose(resultado['desvio_padrao'][i], notas_grupo.std())
+        assert np.allclose(resultado['percentis'][i], np.percentile(notas_grupo, PERCENTIS))
+        assert (resultado['histograma'][i] == np.histogram(notas_grupo, bins=np.arange(0, 101, 10))[0]).all()
+
+for agrupar_por in ('materia', 'turma', 'aluno'):
+    estatisticas = medir(f'estatisticas_notas({agrupar_por!r}) sobre o banco', lambda: estatisticas_notas(agrupar_por))
+    print(f'    {len(estatisticas)} grupo(s), {sum(g["n"] for g in estatisticas)} nota(s)')
@@ -0,0 +1,83 @@
+"""
+Benchmark de consultas do lançamento de notas em massa
+(notas_por_aluno_form_batch).
+
+Compara o caminho antigo (update_or_create por aluno x matéria) com
+salvar_notas, contando as consultas SQL de uma turma inteira em um
+bimestre. Tudo roda dentro de uma transação desfeita ao final, então o
+banco não é alterado.
+
+Uso:
+    python manage.py shell < school/scripts/benchmark_notas.py
+"""
+import time
+from datetime import date
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from school.models import Aluno, Materia, Nota, Responsavel, Turmas
+from school.utils.notas import salvar_notas
+
+N_ALUNOS = 40
+BIMESTRE = 1
+
+
+class _Rollback(Exception):
+    pass
+
+
+def notas_antigas(celulas):
+    for (aluno_id, materia_id), (nota, observacao) in celulas.items():
+        if nota:
+            Nota.objects.update_or_create(
+                aluno_id=aluno_id, materia_id=materia_id, bimestre=BIMESTRE,
+                defaults={'nota': nota, 'observacao': observacao},
+            )
+
+
+def medir(nome, funcao):
+    with CaptureQueriesContext(connection) as ctx:
+        inicio = time.perf_counter()
+        funcao()
+        duracao = (time.perf_counter() - inicio) * 1000
+    print(f'{nome:<40} {len(ctx.captured_queries):>5} consultas  {duracao:8.1f} ms')
+
+
+try:
+    with transaction.atomic():
+        turmas = [
+            Turmas.objects.create(class_name='1°', itinerary_name='N', godfather_prof='-', class_representante='-')
+            for _ in range(2)
+        ]
+        responsavel = Responsavel.objects.create(
+            complet_name='Benchmark', phone_number='11999999999', email='bench@exemplo.com',
+            cpf='00000000191', birthday=date(1980, 1, 1),
+        )
+        Aluno.objects.bulk_create([
+            Aluno(
+                complet_name_aluno=f'Aluno {i}', responsavel=responsavel, phone_number_aluno='11999999999',
+                matricula_aluno=str(i), email_aluno='aluno@exemplo.com', cpf_aluno=f'bench{i:06d}',
+                birthday_aluno=date(2008, 1, 1), class_choices=turmas[i % 2],
+            )
+            for i in range(N_ALUNOS * 2)
+        ])
+        materias = list(Materia.objects.all()) or [
+            Materia.objects.create(name_subject=codigo) for codigo, _ in Materia.MATERIA_CHOICES
+        ]
+
+        def grade(turma, deslocamento):
+            ids = Aluno.objects.filter(class_choices=turma).values_list('id', flat=True)
+            return {
+                (aluno_id, materia.id): (str(60 + (aluno_id + materia.id + deslocamento) % 40), '')
+                for aluno_id in ids for materia in materias
+            }
+
+        print(f'Notas de {N_ALUNOS} alunos x {len(materias)} matérias')
+        medir('antigo: primeiro lançamento', lambda: notas_antigas(grade(turmas[0], 0)))
+        medir('antigo: relançamento com alterações', lambda: notas_antigas(grade(turmas[0], 7)))
+        medir('salvar_notas: primeiro lançamento', lambda: salvar_notas(BIMESTRE, grade(turmas[1], 0)))
+        medir('salvar_notas: relançamento com alterações', lambda: salvar_notas(BIMESTRE, grade(turmas[1], 7)))
+        raise _Rollback
+except _Rollback:
+    pass
@@ -0,0 +1,90 @@
+"""
+Verificação do número de consultas SQL da API de leitura (views_api.py).
+
+Cria alunos, responsáveis, professores, turmas e disciplinas de teste e
+confere que cada endpoint responde com UMA consulta por página,
+independentemente do tamanho da página, da profundidade (página seguinte
+pelo cursor), de ?fields= e dos filtros. Falha com AssertionError se algum
+endpoint passar a fazer N+1. Tudo roda dentro de uma transação desfeita ao
+final, então o banco não é alterado.
+
+Uso:
+    python manage.py shell < school/scripts/verificar_consultas_api.py
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from school.models import Aluno, Materia, Professor, Responsavel, Turmas
+
+N_ALUNOS = 120
+
+
+class _Rollback(Exception):
+    pass
+
+
+def verificar(cliente, url, esperado=1):
+    with CaptureQueriesContext(connection) as ctx:
+        resposta = cliente.get(url)
+    assert resposta.status_code == 200, f'{url}: status {resposta.status_code} {resposta.content[:200]}'
+    consultas = len(ctx.captured_queries)
+    itens = len(resposta.data['results'])
+    print(f'{url:<60} {itens:>4} itens  {consultas:>3} consulta(s)')
+    assert consultas == esperado, f'{url}: {consultas} consultas (esperado {esperado})'
+    return resposta.data
+
+
+try:
+    with transaction.atomic():
+        turmas = [
+            Turmas.objects.create(class_name='1°', itinerary_name=itinerario, godfather_prof='-', class_representante='-')
+            for itinerario in ('N', 'DS')
+        ]
+        materias = [Materia.objects.create(name_subject=sigla) for sigla in ('MAT', 'LG')]
+        responsaveis = Responsavel.objects.bulk_create([
+            Responsavel(
+                complet_name=f'Responsável {i}', phone_number='11999999999', email=f'resp{i}@exemplo.com',
+                cpf=f'api{i:08d}', birthday=date(1980, 1, 1),
+            )
+            for i in range(N_ALUNOS)
+        ])
+        Aluno.objects.bulk_create([
+            Aluno(
+                complet_name_aluno=f'Aluno {i}', responsavel=responsaveis[i], phone_number_aluno='11999999999',
+                matricula_aluno=str(i), email_aluno='aluno@exemplo.com', cpf_aluno=f'api{i:08d}',
+                birthday_aluno=date(2008, 1, 1), class_choices=turmas[i % 2],
+            )
+            for i in range(N_ALUNOS)
+        ])
+        Professor.objects.bulk_create([
+            Professor(
+                complet_name_prof=f'Professor {i}', materia_prof='-', phone_number_prof='11999999999',
+                matricula_prof=str(i), email_prof='prof@exemplo.com', cpf_prof=f'api{i:08d}',
+                birthday_prof=date(1975, 1, 1), subject_choice=materias[i % 2], class_choices=turmas[i % 2],
+            )
+            for i in range(N_ALUNOS)
+        ])
+
+        cliente = APIClient()
+        cliente.force_authenticate(User.objects.create(username='verificar_consultas_api'))
+
+        for recurso in ('alunos', 'professores', 'responsaveis', 'turmas', 'materias'):
+            dados = verificar(cliente, f'/api/{recurso}/?page_size=100')
+            # Página seguinte pelo cursor: mesma quantidade de consultas
+            if dados['next']:
+                verificar(cliente, dados['next'].split('testserver', 1)[-1])
+        verificar(cliente, f'/api/alunos/?turma={turmas[1].id}&nome=aluno 1&fields=id,complet_name_aluno,turma')
+        verificar(cliente, f'/api/professores/?materia={materias[0].id}&fields=id,materia')
+        verificar(cliente, f'/api/responsaveis/?turma={turmas[0].id}')
+        verificar(cliente, '/api/turmas/?itinerario=DS&fields=id,nome')
+
+        # ?fields= com campo inexistente: 400 com a lista de campos válidos
+        assert cliente.get('/api/alunos/?fields=id,inexistente').status_code == 400
+        print('OK: todos os endpoints com uma consulta por página.')
+        raise _Rollback
+except _Rollback:
+    pass
@@ -0,0 +1,39 @@
+"""
+Confere o serviço alunos_acima_do_limite contra o cálculo antigo de
+relatorio_faltas_excedidas (uma contagem de datas por turma e uma contagem
+de faltas por aluno) e compara o número de consultas de cada um.
+
+Uso:
+    python manage.py shell < school/scripts/verificar_faltas_excedidas.py
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from school.models import Aluno, Falta, Turmas
+from school.utils.frequencia import alunos_acima_do_limite
+
+
+def calculo_antigo(limite=0.25):
+    alunos_excedentes = []
+    for turma in Turmas.objects.all():
+        alunos = Aluno.objects.filter(class_choices=turma)
+        total_aulas = Falta.objects.filter(turma=turma).values('data').distinct().count()
+        for aluno in alunos:
+            faltas = Falta.objects.filter(aluno=aluno, turma=turma, status='F').count()
+            if total_aulas > 0 and faltas / total_aulas > limite:
+                alunos_excedentes.append({
+                    'aluno': aluno.complet_name_aluno, 'turma': turma, 'faltas': faltas,
+                    'percentual': round(faltas / total_aulas * 100, 2)
+                })
+    return alunos_excedentes
+
+
+campos = ('aluno', 'turma', 'faltas', 'percentual')
+for limite in (0.1, 0.25, 0.5):
+    with CaptureQueriesContext(connection) as antigo_ctx:
+        antigo = calculo_antigo(limite)
+    with CaptureQueriesContext(connection) as novo_ctx:
+        novo = [{campo: linha[campo] for campo in campos} for linha in alunos_acima_do_limite(limite)]
+    situacao = 'OK' if antigo == novo else 'DIVERGENTE'
+    print(f'limite {limite:.0%}: {len(novo)} aluno(s) - {situacao} '
+          f'({len(antigo_ctx.captured_queries)} consultas antes, {len(novo_ctx.captured_queries)} agora)')
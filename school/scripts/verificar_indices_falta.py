@@ -0,0 +1,44 @@
+"""
+Verifica, via EXPLAIN, que as consultas mais frequentes sobre Falta usam
+índices em vez de varrer a tabela inteira.
+
+Roda cada consulta com QuerySet.explain() e falha (SystemExit 1) se algum
+plano contiver uma varredura completa de school_falta ("SCAN school_falta"
+sem índice no SQLite, "Seq Scan on school_falta" no PostgreSQL).
+
+Uso:
+    python manage.py shell < school/scripts/verificar_indices_falta.py
+"""
+import re
+from datetime import date
+
+from school.models import Falta
+
+TABELA = Falta._meta.db_table
+VARREDURA_COMPLETA = [
+    re.compile(rf'\bSCAN {TABELA}\b(?!.*\bINDEX\b)'),  # SQLite
+    re.compile(rf'Seq Scan on {TABELA}\b'),            # PostgreSQL
+]
+
+inicio, fim = date(2025, 2, 1), date(2025, 4, 30)
+consultas = {
+    'faltas por turma (turma, status)': Falta.objects.filter(turma_id=1, status='F'),
+    'faltas por aluno (aluno, status)': Falta.objects.filter(aluno_id=1, status='F'),
+    'chamadas do aluno no período (aluno, data)': Falta.objects.filter(aluno_id=1, data__range=(inicio, fim)),
+    'datas distintas por turma (turma, data)': Falta.objects.filter(turma_id=1).values('data').distinct(),
+    'datas distintas por turma no período (turma, data)': (
+        Falta.objects.filter(turma_id=1, data__range=(inicio, fim)).values('data').distinct()
+    ),
+}
+
+falhas = 0
+for nome, queryset in consultas.items():
+    plano = queryset.explain()
+    varre = any(padrao.search(linha) for linha in plano.splitlines() for padrao in VARREDURA_COMPLETA)
+    print(f"{'FALHA' if varre else 'OK':<6} {nome}")
+    for linha in plano.splitlines():
+        print(f'       {linha}')
+    falhas += varre
+
+if falhas:
+    raise SystemExit(1)
@@ -0,0 +1,97 @@
+from rest_framework import serializers
+
+from .models import Aluno, Materia, Professor, Responsavel, Turmas
+
+
+class CamposSelecionaveisMixin:
+    """Permite escolher os campos da resposta (parâmetro ?fields= da API).
+
+    `campos`: nomes dos campos a manter; None mantém todos. Nomes
+    desconhecidos geram ValidationError (400) com os campos válidos.
+    """
+
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is None:
+            return
+        desconhecidos = set(campos) - set(self.fields)
+        if desconhecidos:
+            raise serializers.ValidationError({
+                'fields': f"Campos desconhecidos: {', '.join(sorted(desconhecidos))}. "
+                          f"Disponíveis: {', '.join(self.fields)}."
+            })
+        for nome in set(self.fields) - set(campos):
+            self.fields.pop(nome)
+
+
+# Representações resumidas usadas dentro de outros recursos (sem consultas
+# extras: as views carregam as relações com select_related)
+
+class TurmaResumoSerializer(serializers.ModelSerializer):
+    nome = serializers.CharField(source='__str__', read_only=True)
+
+    class Meta:
+        model = Turmas
+        fields = ['id', 'nome']
+
+
+class MateriaResumoSerializer(serializers.ModelSerializer):
+    nome = serializers.CharField(source='get_name_subject_display', read_only=True)
+
+    class Meta:
+        model = Materia
+        fields = ['id', 'nome']
+
+
+class ResponsavelResumoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Responsavel
+        fields = ['id', 'complet_name', 'phone_number', 'email']
+
+
+# Recursos da API
+
+class TurmaSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
+    nome = serializers.CharField(source='__str__', read_only=True)
+
+    class Meta:
+        model = Turmas
+        fields = ['id', 'nome', 'class_name', 'itinerary_name', 'godfather_prof', 'class_representante']
+
+
+class MateriaSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
+    nome = serializers.CharField(source='get_name_subject_display', read_only=True)
+
+    class Meta:
+        model = Materia
+        fields = ['id', 'name_subject', 'nome']
+
+
+class ResponsavelSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Responsavel
+        fields = ['id', 'complet_name', 'phone_number', 'email', 'cpf', 'birthday']
+
+
+class AlunoSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
+    turma = TurmaResumoSerializer(source='class_choices', read_only=True)
+    responsavel = ResponsavelResumoSerializer(read_only=True)
+
+    class Meta:
+        model = Aluno
+        fields = [
+            'id', 'complet_name_aluno', 'matricula_aluno', 'email_aluno', 'phone_number_aluno',
+            'cpf_aluno', 'birthday_aluno', 'turma', 'responsavel',
+        ]
+
+
+class ProfessorSerializer(CamposSelecionaveisMixin, serializers.ModelSerializer):
+    materia = MateriaResumoSerializer(source='subject_choice', read_only=True)
+    turma = TurmaResumoSerializer(source='class_choices', read_only=True)
+
+    class Meta:
+        model = Professor
+        fields = [
+            'id', 'complet_name_prof', 'matricula_prof', 'email_prof', 'phone_number_prof',
+            'materia_prof', 'materia', 'turma',
+        ]
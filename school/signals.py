@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Falta, Nota, PeriodoLetivo, PlanejamentoItem, PlanejamentoSemanal
+from .utils.desempenho import agendar_desempenho
+from .utils.frequencia import agendar_recalculo, recalcular_frequencia
+from .utils.periodos import limpar_cache_periodos, periodo_da_data
+from .utils.planejamentos import agendar_documento
+
+
+# ------------------- RESUMO DE FREQUÊNCIA -------------------
+# bulk_create/bulk_update não disparam sinais: salvar_chamada recalcula o
+# resumo por conta própria.
+
+@receiver(pre_save, sender=Falta)
+def falta_pre_save(sender, instance, **kwargs):
+    # Em edições, guarda a partição antiga (turma/data anteriores) para recalcular após salvar
+    instance._particao_anterior = None
+    if instance.pk:
+        anterior = Falta.objects.filter(pk=instance.pk).values_list('turma_id', 'data').first()
+        if anterior and anterior != (instance.turma_id, instance.data):
+            instance._particao_anterior = (anterior[0], periodo_da_data(anterior[1]))
+
+
+@receiver(post_save, sender=Falta)
+def falta_post_save(sender, instance, **kwargs):
+    anterior = getattr(instance, '_particao_anterior', None)
+    if anterior:
+        agendar_recalculo(*anterior)
+    agendar_recalculo(instance.turma_id, periodo_da_data(instance.data))
+
+
+@receiver(post_delete, sender=Falta)
+def falta_post_delete(sender, instance, **kwargs):
+    agendar_recalculo(instance.turma_id, periodo_da_data(instance.data))
+
+
+# ------------------- CALENDÁRIO LETIVO -------------------
+# Mudar o calendário muda a partição de chamadas já registradas: limpa o
+# cache do resolvedor e reconstrói o resumo de frequência após o commit.
+
+@receiver(post_save, sender=PeriodoLetivo)
+@receiver(post_delete, sender=PeriodoLetivo)
+def periodo_letivo_alterado(sender, instance, **kwargs):
+    limpar_cache_periodos()
+    transaction.on_commit(recalcular_frequencia)
+
+
+# ------------------- RESUMO DE DESEMPENHO -------------------
+# bulk_create/bulk_update não disparam sinais: salvar_notas recalcula o
+# resumo dos alunos afetados de uma vez.
+
+@receiver(pre_save, sender=Nota)
+def nota_pre_save(sender, instance, **kwargs):
+    # Em edições que trocam o aluno da nota, o aluno anterior também é recalculado
+    instance._aluno_anterior = None
+    if instance.pk:
+        anterior = Nota.objects.filter(pk=instance.pk).values_list('aluno_id', flat=True).first()
+        if anterior is not None and anterior != instance.aluno_id:
+            instance._aluno_anterior = anterior
+
+
+@receiver(post_save, sender=Nota)
+def nota_post_save(sender, instance, **kwargs):
+    anterior = getattr(instance, '_aluno_anterior', None)
+    if anterior:
+        agendar_desempenho(anterior)
+    agendar_desempenho(instance.aluno_id)
+
+
+@receiver(post_delete, sender=Nota)
+def nota_post_delete(sender, instance, **kwargs):
+    agendar_desempenho(instance.aluno_id)
+
+
+# ------------------- DOCUMENTO DO PLANEJAMENTO SEMANAL -------------------
+# O documento é gerado em segundo plano após o commit, uma vez por
+# sequência de edições, e só quando o conteúdo mudou.
+
+@receiver(post_save, sender=PlanejamentoSemanal)
+def planejamento_post_save(sender, instance, **kwargs):
+    agendar_documento(instance.pk)
+
+
+@receiver(post_save, sender=PlanejamentoItem)
+@receiver(post_delete, sender=PlanejamentoItem)
+def planejamento_item_alterado(sender, instance, **kwargs):
+    agendar_documento(instance.planejamento_id)
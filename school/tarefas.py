@@ -0,0 +1,76 @@
+"""
+Tipos de job (tarefas em segundo plano) executados por `run_workers`.
+
+Cada função recebe o job e os parâmetros gravados em `Job.parametros` e
+devolve (nome_do_arquivo, conteúdo), ou None quando o resultado é gravado
+em outro lugar. O conteúdo sai das mesmas funções
+usadas pelas views, então o arquivo do job é idêntico ao da resposta
+síncrona. Importado no `ready()` do app para registrar os tipos.
+"""
+
+from django.utils.text import slugify
+
+from .models import PlanejamentoSemanal, Turmas
+from .utils.boletins import boletins_turma, pdf_boletins, zip_boletins
+from .utils.jobs import registrar_progresso, tarefa
+from .views_disciplina import pdf_faltas_turma, pdf_presencas_turma
+from .views_relatorio import csv_frequencia, csv_notas_turma, pdf_frequencia
+
+
+def _sufixo_turma(turma_id):
+    return f'_turma_{turma_id}' if turma_id else ''
+
+
+@tarefa('relatorio_frequencia_pdf')
+def relatorio_frequencia_pdf(job, turma_id=None):
+    return f'relatorio_presencas{_sufixo_turma(turma_id)}.pdf', pdf_frequencia(turma_id)
+
+
+@tarefa('relatorio_frequencia_csv')
+def relatorio_frequencia_csv(job, turma_id=None):
+    return f'relatorio_presencas{_sufixo_turma(turma_id)}.csv', csv_frequencia(turma_id)
+
+
+@tarefa('relatorio_notas_csv')
+def relatorio_notas_csv(job, turma_id, bimestre, ano=None):
+    return f'notas_turma_{turma_id}_bimestre_{bimestre}.csv', csv_notas_turma(turma_id, bimestre, ano)
+
+
+@tarefa('relatorio_faltas_turma_pdf')
+def relatorio_faltas_turma_pdf(job, turma_id):
+    return f'relatorio_faltas_turma_{turma_id}.pdf', pdf_faltas_turma(turma_id)
+
+
+@tarefa('relatorio_presencas_turma_pdf')
+def relatorio_presencas_turma_pdf(job, turma_id):
+    return f'relatorio_presenca_turma_{turma_id}.pdf', pdf_presencas_turma(turma_id)
+
+
+@tarefa('boletins_turma')
+def boletins_turma_job(job, turma_id, bimestre=None, ano=None, formato='zip'):
+    turma = Turmas.objects.get(id=turma_id)
+    boletins = boletins_turma(turma.id, bimestre, ano)
+    if not boletins:
+        raise ValueError(f'A turma {turma} não tem alunos.')
+    sufixo = f'_{bimestre}bim' if bimestre else ''
+    nome = f'boletins_{slugify(str(turma)) or turma.id}{sufixo}'
+    if formato == 'pdf':
+        return f'{nome}.pdf', pdf_boletins(boletins)
+
+    def com_progresso():
+        # Progresso conforme os boletins entram na fila de renderização
+        for feitos, boletim in enumerate(boletins, 1):
+            yield boletim
+            registrar_progresso(job, feitos, len(boletins))
+
+    return f'{nome}.zip', zip_boletins(com_progresso())
+
+
+@tarefa('planejamento_documento')
+def planejamento_documento(job, planejamento_id):
+    # Agendado pelos sinais (utils/planejamentos.py); o documento fica em
+    # PlanejamentoSemanal.arquivo_pdf e só é refeito se o conteúdo mudou
+    planejamento = PlanejamentoSemanal.objects.select_related('professor').filter(id=planejamento_id).first()
+    if planejamento is not None:
+        planejamento.generate_planejamento_document()
+    return None
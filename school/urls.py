@@ -17,8 +17,9 @@ from . import views # Para funções gerais/hubs (index, alunos, turmas, desempe
 
 # 🚨 1. VIEWS ACADÊMICAS (Contrato, Boletim, Gráficos, Suspensão, etc.)
 from .views_academico import (
-    gerar_contrato_pdf, boletim_aluno, boletim_aluno_pdf,
+    gerar_contrato_pdf, boletim_aluno, boletim_aluno_pdf, boletins_turma_pdf,
     grafico_desempenho_aluno, relatorio_turma, grafico_disciplina,
+    grafico_desempenho_aluno_imagem, relatorio_turma_grafico, grafico_disciplina_imagem,
     desempenho_aluno_select, desempenho_turma_select, desempenho_disciplina_select,
     suspensao_select_turma, suspensao_select_aluno, suspensao_create, suspensao_list
 )
@@ -38,6 +39,30 @@ from .views_eventos import (
 # Advertência (mantida separada)
 from .views_advertencia import gerar_advertencia_pdf
 
+# 🚨 4. VIEWS RELATÓRIO (Frequência e notas em CSV/PDF)
+from .views_relatorio import (
+    relatorio_select, gerar_relatorio_presenca_excel, gerar_relatorio_presenca_excel_turma,
+    gerar_relatorio_presenca_pdf, gerar_relatorio_presenca_pdf_turma, gerar_relatorio_notas_csv_turma
+)
+
+# 5. VIEWS ANALYTICS (Estatísticas de notas)
+from .views_analytics import estatisticas_notas_json
+
+# 6. VIEWS JOBS (Acompanhamento das tarefas em segundo plano)
+from .views_jobs import job_status, job_download
+
+# 7. VIEWS API (Leitura via Django REST Framework para o front-end React)
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from .views_api import AlunoViewSet, MateriaViewSet, ProfessorViewSet, ResponsavelViewSet, TurmaViewSet
+
+api = DefaultRouter()
+api.register('alunos', AlunoViewSet, basename='api-alunos')
+api.register('turmas', TurmaViewSet, basename='api-turmas')
+api.register('materias', MateriaViewSet, basename='api-materias')
+api.register('professores', ProfessorViewSet, basename='api-professores')
+api.register('responsaveis', ResponsavelViewSet, basename='api-responsaveis')
+
 app_name = 'school'
 
 urlpatterns = [
@@ -78,6 +103,15 @@ urlpatterns = [
     path('grafico/aluno/<int:aluno_id>/', grafico_desempenho_aluno, name='grafico_desempenho_aluno'),
     path('relatorio/turma/<int:turma_id>/', relatorio_turma, name='relatorio_turma'),
     path('grafico/disciplina/<int:materia_id>/', grafico_disciplina, name='grafico_disciplina'),
+    # Imagens dos gráficos (png ou svg), com ETag para o navegador revalidar
+    path('grafico/aluno/<int:aluno_id>/imagem.<str:formato>', grafico_desempenho_aluno_imagem, name='grafico_desempenho_aluno_imagem'),
+    path('relatorio/turma/<int:turma_id>/grafico.<str:formato>', relatorio_turma_grafico, name='relatorio_turma_grafico'),
+    path('grafico/disciplina/<int:materia_id>/imagem.<str:formato>', grafico_disciplina_imagem, name='grafico_disciplina_imagem'),
+    # Séries dos mesmos gráficos em JSON, para os painéis React (proxy /api do Vite)
+    path('api/graficos/aluno/<int:aluno_id>/', grafico_desempenho_aluno_imagem, {'formato': 'json'}, name='grafico_desempenho_aluno_dados'),
+    path('api/graficos/turma/<int:turma_id>/', relatorio_turma_grafico, {'formato': 'json'}, name='relatorio_turma_dados'),
+    path('api/graficos/disciplina/<int:materia_id>/', grafico_disciplina_imagem, {'formato': 'json'}, name='grafico_disciplina_dados'),
+    path('analytics/notas/', estatisticas_notas_json, name='estatisticas_notas'),
 
 
     # ------------------------------------
@@ -86,11 +120,29 @@ urlpatterns = [
     path('gerar-contrato/<int:aluno_id>/', gerar_contrato_pdf, name='gerar_contrato_pdf'),
     path('boletim/<int:aluno_id>/', boletim_aluno, name='boletim_aluno'),
     path('boletim/<int:aluno_id>/pdf/', boletim_aluno_pdf, name='boletim_aluno_pdf'),
+    path('boletins/turma/<int:turma_id>/', boletins_turma_pdf, name='boletins_turma_pdf'),
 
     path('faltas/aluno/<int:aluno_id>/pdf/', faltas_aluno_pdf, name='faltas_aluno_pdf'), 
     path('relatorio-faltas/<int:turma_id>/', relatorio_faltas_pdf, name='relatorio_faltas_pdf'),
     path('relatorio-presenca/<int:turma_id>/', relatorio_presenca_pdf, name='relatorio_presenca_pdf'),
 
+    # Relatórios de frequência e notas (CSV transmitido em partes / PDF)
+    path('relatorios/frequencia/', relatorio_select, name='relatorio_select'),
+    path('relatorios/frequencia/csv/', gerar_relatorio_presenca_excel, name='relatorio_excel'),
+    path('relatorios/frequencia/pdf/', gerar_relatorio_presenca_pdf, name='relatorio_pdf'),
+    path('relatorios/frequencia/<int:turma_id>/csv/', gerar_relatorio_presenca_excel_turma, name='relatorio_excel_turma'),
+    path('relatorios/frequencia/<int:turma_id>/pdf/', gerar_relatorio_presenca_pdf_turma, name='relatorio_pdf_turma'),
+    path('relatorios/notas/<int:turma_id>/<int:bimestre>/csv/', gerar_relatorio_notas_csv_turma, name='relatorio_notas_csv_turma'),
+
+    # API de leitura (views_api.py) e tokens JWT usados pelo front-end React
+    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/', include(api.urls)),
+
+    # Jobs em segundo plano (relatórios pedidos com ?async=1)
+    path('jobs/<uuid:chave>/', job_status, name='job_status'),
+    path('jobs/<uuid:chave>/download/', job_download, name='job_download'),
+
     # Advertências
     path('advertencia/<int:advertencia_id>/pdf/', gerar_advertencia_pdf, name='gerar_advertencia_pdf'),
 
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+
+from .pdf import renderizar_lote
+
+
+class ResultadoEnvio(NamedTuple):
+    advertencia: object
+    destinatario: Optional[str]
+    enviado: bool
+    erro: Optional[str]
+
+
+def html_advertencia(advertencia):
+    """HTML do documento de advertência.
+
+    Usa `advertencia.aluno.responsavel` e a turma do aluno: carregue com
+    select_related('aluno__responsavel', 'aluno__class_choices').
+    """
+    aluno = advertencia.aluno
+    return render_to_string('documentoadvertencia_pdf.html', {
+        'advertencia': advertencia,
+        'aluno': aluno,
+        'responsavel': aluno.responsavel,
+    })
+
+
+def _mensagem(advertencia, pdf):
+    aluno = advertencia.aluno
+    responsavel = aluno.responsavel
+    mensagem = EmailMessage(
+        subject=f"Documento de Advertência - {aluno.complet_name_aluno}",
+        body=(
+            f"Prezado(a) {responsavel.complet_name},\n\n[Mensagem...] Data de emissão: "
+            f"{datetime.now().strftime('%d/%m/%Y %H:%M')}\n\nAtenciosamente,\nEquipe Escolar"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[responsavel.email],
+    )
+    mensagem.attach('advertencia.pdf', pdf, 'application/pdf')
+    return mensagem
+
+
+def enviar_advertencias(advertencias):
+    """Gera o PDF de cada advertência e envia aos responsáveis por e-mail.
+
+    Os PDFs são renderizados em paralelo (`renderizar_lote`) e cada e-mail é
+    enviado assim que o seu PDF fica pronto, todos pela mesma conexão SMTP
+    (`get_connection` aberta uma única vez). Só os PDFs em renderização
+    ficam em memória.
+
+    Retorna uma lista de ResultadoEnvio, um por advertência, na ordem
+    recebida: sem e-mail do responsável, erro no PDF ou erro no envio não
+    interrompem as demais.
+    """
+    resultados = {}
+    documentos = []
+    for advertencia in advertencias:
+        responsavel = advertencia.aluno.responsavel
+        if not responsavel or not responsavel.email:
+            resultados[advertencia.id] = ResultadoEnvio(advertencia, None, False, "Responsável sem e-mail cadastrado.")
+        else:
+            resultados[advertencia.id] = None
+            documentos.append((advertencia, html_advertencia(advertencia)))
+
+    if not documentos:
+        return list(resultados.values())
+
+    conexao = get_connection(fail_silently=False)
+    try:
+        conexao.open()
+    except Exception as erro:
+        for advertencia, _ in documentos:
+            resultados[advertencia.id] = ResultadoEnvio(
+                advertencia, advertencia.aluno.responsavel.email, False, f"Erro ao conectar ao servidor de e-mail: {erro}"
+            )
+        return list(resultados.values())
+
+    try:
+        for advertencia, pdf, erro in renderizar_lote(documentos):
+            destinatario = advertencia.aluno.responsavel.email
+            if erro is not None:
+                resultados[advertencia.id] = ResultadoEnvio(advertencia, destinatario, False, f"Erro ao gerar o PDF: {erro}")
+                continue
+            try:
+                conexao.send_messages([_mensagem(advertencia, pdf)])
+            except Exception as erro_envio:
+                resultados[advertencia.id] = ResultadoEnvio(advertencia, destinatario, False, f"Erro ao enviar: {erro_envio}")
+            else:
+                resultados[advertencia.id] = ResultadoEnvio(advertencia, destinatario, True, None)
+    finally:
+        conexao.close()
+
+    return list(resultados.values())
@@ -0,0 +1,26 @@
+from django.conf import settings
+
+
+def aquecer_bibliotecas():
+    """Importa no processo atual as bibliotecas pesadas que as views carregam sob demanda.
+
+    Por padrão ReportLab, matplotlib, NumPy e WeasyPrint só são importados no
+    primeiro relatório, gráfico, estatística ou PDF, e um worker que só
+    serve páginas simples nunca os carrega. Workers dedicados a relatórios
+    podem pagar esse custo na inicialização (settings.AQUECER_BIBLIOTECAS),
+    e não na primeira requisição. Com o servidor carregando a aplicação antes
+    do fork (ex.: gunicorn --preload), as páginas de memória são
+    compartilhadas entre os workers.
+    """
+    # Estatísticas de notas, relatórios de frequência/chamadas e gráficos
+    # (font_manager carrega o cache de fontes do matplotlib)
+    import numpy
+    import reportlab.lib.styles
+    import reportlab.platypus
+    from matplotlib import figure, font_manager
+    from matplotlib.backends import backend_agg
+
+    # Com PDF_WORKERS > 0 o WeasyPrint roda nos processos de renderização
+    # (ver PDF_AQUECER); só é importado aqui quando renderiza no próprio processo
+    if not getattr(settings, 'PDF_WORKERS', 2):
+        import weasyprint
@@ -0,0 +1,46 @@
+import zipfile
+
+
+class _Buffer:
+    """Destino de escrita do ZipFile que só acumula os bytes até serem retirados.
+
+    Sem `seek`, o ZipFile grava cada entrada com descritor de dados no fim, o
+    que permite enviar o arquivo em partes sem voltar ao início.
+    """
+
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+        return dados
+
+
+def gerar_zip(arquivos):
+    """Gera um ZIP em partes de bytes, uma parte por arquivo adicionado.
+
+    `arquivos` é um iterável de (nome, bytes), consumido aos poucos: cada
+    arquivo vai para o ZIP e sai do gerador assim que chega, então o ZIP
+    inteiro nunca fica em memória. Próprio para StreamingHttpResponse ou
+    para gravar em disco parte a parte.
+    """
+    buffer = _Buffer()
+    # PDFs já são comprimidos: armazenar sem compressão é mais rápido e quase do mesmo tamanho
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as arquivo_zip:
+        for nome, dados in arquivos:
+            arquivo_zip.writestr(nome, dados)
+            yield buffer.retirar()
+    yield buffer.retirar()
@@ -0,0 +1,118 @@
+from copy import copy
+
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from ..models import Aluno, FrequenciaResumo, Materia, Nota
+from .pdf import renderizar_pdf_combinado, zip_pdfs
+from .periodos import intervalo_ano_letivo
+
+BIMESTRE_CHOICES = [(1, '1º Bimestre'), (2, '2º Bimestre'), (3, '3º Bimestre'), (4, '4º Bimestre')]
+
+
+def contexto_boletim(aluno, materias, notas, frequencias, bimestre=None):
+    """Contexto do template boletim_select_bimestre.html a partir de dados já carregados.
+
+    - materias: todas as matérias; o template recebe cópias anotadas com as
+      notas do aluno (`nota_bimestre` ou `notas_por_bimestre`)
+    - notas: notas do aluno (já restritas ao ano letivo, se for o caso)
+    - frequencias: linhas de FrequenciaResumo do aluno
+    - bimestre: número do bimestre ou None para o boletim consolidado
+    """
+    if bimestre:
+        notas_bim = [nota for nota in notas if nota.bimestre == bimestre]
+        por_materia = {nota.materia_id: nota for nota in notas_bim}
+        materias_aluno = []
+        for materia in materias:
+            materia = copy(materia)
+            materia.nota_bimestre = por_materia.get(materia.id)
+            materias_aluno.append(materia)
+
+        # Totais do bimestre lidos do resumo de frequência (uma linha por turma)
+        linhas = [linha for linha in frequencias if linha.bimestre == bimestre]
+        faltas_bimestre = sum(linha.faltas for linha in linhas)
+        presencas_bimestre = sum(linha.presencas for linha in linhas)
+        total_chamadas = faltas_bimestre + presencas_bimestre
+        porcentagem_presenca = round((presencas_bimestre / total_chamadas) * 100, 1) if total_chamadas > 0 else None
+
+        return {
+            'aluno': aluno, 'notas': notas_bim, 'faltas_bimestre': faltas_bimestre,
+            'bimestre': bimestre, 'bimestre_choices': BIMESTRE_CHOICES,
+            'tem_alerta': any(nota.nota < 70 for nota in notas_bim),
+            'materias': materias_aluno, 'porcentagem_presenca': porcentagem_presenca,
+        }
+
+    # Todos os bimestres (tabela consolidada)
+    notas_dict = {}
+    for nota in notas:
+        notas_dict.setdefault(nota.materia_id, {})[nota.bimestre] = nota
+    materias_com_nota = []
+    for materia in materias:
+        if notas_dict.get(materia.id):
+            materia = copy(materia)
+            materia.notas_por_bimestre = notas_dict[materia.id]
+            materias_com_nota.append(materia)
+
+    return {
+        'aluno': aluno, 'materias': materias_com_nota,
+        'tem_alerta': any(nota.nota < 70 for nota in notas),
+        'bimestre': None, 'bimestre_choices': BIMESTRE_CHOICES,
+        'faltas_bimestre': sum(linha.faltas for linha in frequencias),
+    }
+
+
+def html_boletim(aluno, materias, notas, frequencias, bimestre=None):
+    return render_to_string(
+        'boletim_select_bimestre.html',
+        contexto_boletim(aluno, materias, notas, frequencias, bimestre),
+    )
+
+
+def nome_arquivo_boletim(aluno):
+    return f'boletim_{aluno.id}_{slugify(aluno.complet_name_aluno) or "aluno"}.pdf'
+
+
+def boletins_turma(turma_id, bimestre=None, ano=None):
+    """HTML do boletim de cada aluno da turma, em ordem alfabética.
+
+    Retorna uma lista de (aluno, html_string). Todas as notas e frequências
+    da turma são lidas de uma vez: quatro consultas no total (alunos,
+    matérias, notas e frequências), independentemente do número de alunos.
+    O HTML é idêntico ao de `boletim_aluno_pdf`, então os PDFs das duas
+    rotas compartilham o cache.
+    """
+    alunos = list(Aluno.objects.filter(class_choices_id=turma_id).order_by('complet_name_aluno'))
+    if not alunos:
+        return []
+    alunos_ids = [aluno.id for aluno in alunos]
+    materias = list(Materia.objects.all().only('id', 'name_subject'))
+
+    notas_qs = Nota.objects.filter(aluno_id__in=alunos_ids)
+    frequencias_qs = FrequenciaResumo.objects.filter(aluno_id__in=alunos_ids)
+    if ano is not None:
+        notas_qs = notas_qs.filter(data_lancamento__range=intervalo_ano_letivo(ano))
+        frequencias_qs = frequencias_qs.filter(ano=ano)
+
+    notas_por_aluno = {}
+    for nota in notas_qs:
+        notas_por_aluno.setdefault(nota.aluno_id, []).append(nota)
+    frequencias_por_aluno = {}
+    for linha in frequencias_qs:
+        frequencias_por_aluno.setdefault(linha.aluno_id, []).append(linha)
+
+    return [
+        (aluno, html_boletim(
+            aluno, materias, notas_por_aluno.get(aluno.id, []), frequencias_por_aluno.get(aluno.id, []), bimestre
+        ))
+        for aluno in alunos
+    ]
+
+
+def zip_boletins(boletins):
+    """ZIP em partes com um PDF por aluno, renderizados em paralelo."""
+    return zip_pdfs((nome_arquivo_boletim(aluno), html_string) for aluno, html_string in boletins)
+
+
+def pdf_boletins(boletins):
+    """Um único PDF com os boletins de todos os alunos, na ordem recebida."""
+    return renderizar_pdf_combinado(html_string for _, html_string in boletins)
@@ -0,0 +1,46 @@
+from django.db import transaction
+
+from ..models import Falta
+from .frequencia import recalcular_frequencia
+from .periodos import periodo_da_data
+
+
+def salvar_chamada(turma, data, status_por_aluno, professor=None):
+    """Grava a chamada de uma turma em uma única transação.
+
+    `status_por_aluno` é um dicionário {aluno_id: 'P' | 'F'}. Os registros já
+    existentes para (data, turma) são carregados em uma única consulta; o
+    restante é gravado com bulk_create/bulk_update. Como essas operações não
+    disparam sinais, o resumo de frequência da turma/bimestre é recalculado
+    aqui, na mesma transação.
+
+    Retorna uma tupla (criados, atualizados). Registros cujo status e
+    professor não mudaram não são regravados nem contados.
+    """
+    professor_id = professor.pk if professor is not None else None
+
+    with transaction.atomic():
+        existentes = {
+            falta.aluno_id: falta
+            for falta in Falta.objects.filter(data=data, turma=turma).only('id', 'aluno_id', 'status', 'professor_id')
+        }
+
+        novas = []
+        alteradas = []
+        for aluno_id, status in status_por_aluno.items():
+            falta = existentes.get(aluno_id)
+            if falta is None:
+                novas.append(Falta(data=data, turma=turma, aluno_id=aluno_id, status=status, professor_id=professor_id))
+            elif falta.status != status or falta.professor_id != professor_id:
+                falta.status = status
+                falta.professor_id = professor_id
+                alteradas.append(falta)
+
+        if novas:
+            Falta.objects.bulk_create(novas)
+        if alteradas:
+            Falta.objects.bulk_update(alteradas, ['status', 'professor'])
+        if novas or alteradas:
+            recalcular_frequencia(turma.pk, [periodo_da_data(data)])
+
+    return len(novas), len(alteradas)
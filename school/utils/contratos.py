@@ -0,0 +1,44 @@
+from django.template.loader import render_to_string
+from django.utils.text import slugify
+
+from ..models import Aluno
+from .pdf import zip_pdfs
+
+
+def html_contrato(aluno):
+    """HTML do contrato do aluno (usa `aluno.responsavel`: carregue com select_related)."""
+    return render_to_string('contrato.html', {
+        'aluno': aluno,
+        'responsavel': aluno.responsavel,
+    })
+
+
+def nome_arquivo_contrato(aluno):
+    return f'contrato_{aluno.id}_{slugify(aluno.complet_name_aluno) or "aluno"}.pdf'
+
+
+def alunos_para_contratos(alunos=None, turma_id=None):
+    """Alunos com o responsável já carregado (uma consulta), em ordem alfabética.
+
+    `alunos` é um queryset ou lista de IDs; `turma_id` restringe à turma.
+    Sem nenhum dos dois, todos os alunos.
+    """
+    qs = Aluno.objects.select_related('responsavel').order_by('complet_name_aluno', 'id')
+    if alunos is not None:
+        qs = qs.filter(id__in=alunos)
+    if turma_id is not None:
+        qs = qs.filter(class_choices_id=turma_id)
+    return qs
+
+
+def zip_contratos(alunos):
+    """ZIP em partes com o contrato de cada aluno, renderizados em paralelo.
+
+    `alunos` (normalmente de `alunos_para_contratos`) é percorrido aos
+    poucos com `iterator()`: o HTML de cada contrato só é montado quando há
+    vaga na fila de renderização, e cada PDF sai para o ZIP assim que fica
+    pronto, então nem os alunos nem os PDFs ficam todos em memória.
+    """
+    if hasattr(alunos, 'iterator'):
+        alunos = alunos.iterator(chunk_size=200)
+    return zip_pdfs((nome_arquivo_contrato(aluno), html_contrato(aluno)) for aluno in alunos)
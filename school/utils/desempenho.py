@@ -0,0 +1,76 @@
+import threading
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, Min
+
+from ..models import DesempenhoResumo, Nota
+
+_pendentes = threading.local()
+
+DUAS_CASAS = Decimal('0.01')
+
+
+def _resumo(aluno_id, materia_id, bimestre, linha):
+    return DesempenhoResumo(
+        aluno_id=aluno_id,
+        materia_id=materia_id,
+        bimestre=bimestre,
+        media=Decimal(str(linha['media'])).quantize(DUAS_CASAS),
+        min_nota=linha['min_nota'],
+        n_notas=linha['n_notas'],
+    )
+
+
+def recalcular_desempenho(alunos_ids=None):
+    """Recalcula as linhas de DesempenhoResumo a partir de `Nota`.
+
+    Sem argumentos reconstrói a tabela inteira; com `alunos_ids` recalcula
+    apenas esses alunos. São duas consultas agrupadas sobre Nota (por
+    aluno/matéria/bimestre e a geral por aluno), independentemente do número
+    de notas. Retorna o número de linhas gravadas.
+    """
+    notas_qs = Nota.objects.all()
+    resumos_qs = DesempenhoResumo.objects.all()
+    if alunos_ids is not None:
+        alunos_ids = list(alunos_ids)
+        if not alunos_ids:
+            return 0
+        notas_qs = notas_qs.filter(aluno_id__in=alunos_ids)
+        resumos_qs = resumos_qs.filter(aluno_id__in=alunos_ids)
+
+    agregados = {'media': Avg('nota'), 'min_nota': Min('nota'), 'n_notas': Count('id')}
+    notas_qs = notas_qs.order_by()
+    resumos = [
+        _resumo(linha['aluno_id'], linha['materia_id'], linha['bimestre'], linha)
+        for linha in notas_qs.values('aluno_id', 'materia_id', 'bimestre').annotate(**agregados)
+    ]
+    resumos += [
+        _resumo(linha['aluno_id'], None, None, linha)
+        for linha in notas_qs.values('aluno_id').annotate(**agregados)
+    ]
+
+    with transaction.atomic():
+        resumos_qs.delete()
+        DesempenhoResumo.objects.bulk_create(resumos, batch_size=500)
+    return len(resumos)
+
+
+def agendar_desempenho(aluno_id):
+    """Agenda o recálculo do resumo de desempenho do aluno para o commit.
+
+    Usado pelos sinais de Nota: várias gravações na mesma transação (ex.:
+    exclusão em cascata de uma matéria) resultam em um único recálculo, com
+    todos os alunos afetados. Fora de transação o recálculo é imediato.
+    """
+    if not hasattr(_pendentes, 'alunos'):
+        _pendentes.alunos = set()
+    _pendentes.alunos.add(aluno_id)
+    transaction.on_commit(_processar_pendentes)
+
+
+def _processar_pendentes():
+    alunos = getattr(_pendentes, 'alunos', set())
+    _pendentes.alunos = set()
+    if alunos:
+        recalcular_desempenho(alunos)
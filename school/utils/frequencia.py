@@ -0,0 +1,178 @@
+import threading
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast
+
+from ..models import Falta, FrequenciaResumo, Turmas
+from .periodos import expressoes_periodo, intervalo_bimestre
+
+# Limite padrão de faltas (fração do total de aulas da turma)
+LIMITE_FALTAS = 0.25
+
+_pendentes = threading.local()
+
+
+def recalcular_frequencia(turma_id=None, periodos=None):
+    """Recalcula as linhas de FrequenciaResumo a partir de `Falta`.
+
+    Sem argumentos reconstrói a tabela inteira. Com `turma_id` e/ou
+    `periodos` (pares (ano, bimestre) de periodo_da_data) recalcula apenas
+    essas partições, filtradas pelos intervalos de datas do calendário
+    letivo. São duas consultas agrupadas sobre Falta (mais uma para achar os
+    anos com chamadas na reconstrução completa), independentemente do número
+    de alunos. Retorna o número de linhas gravadas.
+    """
+    faltas_qs = Falta.objects.all()
+    resumos_qs = FrequenciaResumo.objects.all()
+    if turma_id is not None:
+        faltas_qs = faltas_qs.filter(turma_id=turma_id)
+        resumos_qs = resumos_qs.filter(turma_id=turma_id)
+
+    if periodos is not None:
+        periodos = set(periodos)
+        if not periodos:
+            return 0
+        intervalos = Q()
+        chaves = Q()
+        for ano, bimestre in periodos:
+            intervalos |= Q(data__range=intervalo_bimestre(ano, bimestre))
+            chaves |= Q(ano=ano, bimestre=bimestre) if bimestre is not None else Q(ano=ano, bimestre__isnull=True)
+        anos = [ano for ano, _ in periodos]
+        primeiro_ano, ultimo_ano = min(anos), max(anos)
+        faltas_qs = faltas_qs.filter(intervalos)
+        resumos_qs = resumos_qs.filter(chaves)
+    else:
+        extremos = faltas_qs.aggregate(primeira=Min('data'), ultima=Max('data'))
+        chaves = Q()
+        if extremos['primeira'] is None:
+            primeiro_ano = ultimo_ano = None
+        else:
+            primeiro_ano, ultimo_ano = extremos['primeira'].year, extremos['ultima'].year
+
+    resumos = []
+    if primeiro_ano is not None:
+        ano_expr, bimestre_expr = expressoes_periodo(primeiro_ano, ultimo_ano)
+        # O intervalo pode alcançar datas de outros períodos (ex.: recesso de
+        # um ano inteiro); o filtro por chave mantém só as partições pedidas.
+        faltas_qs = faltas_qs.annotate(ano=ano_expr, bimestre=bimestre_expr).filter(chaves).order_by()
+        total_aulas = {
+            (turma, ano, bimestre): total
+            for turma, ano, bimestre, total in faltas_qs.values_list('turma_id', 'ano', 'bimestre').annotate(total=Count('data', distinct=True))
+        }
+        linhas = faltas_qs.values('aluno_id', 'turma_id', 'ano', 'bimestre').annotate(
+            n_presencas=Count('id', filter=Q(status='P')),
+            n_faltas=Count('id', filter=Q(status='F')),
+        )
+        resumos = [
+            FrequenciaResumo(
+                aluno_id=linha['aluno_id'],
+                turma_id=linha['turma_id'],
+                ano=linha['ano'],
+                bimestre=linha['bimestre'],
+                presencas=linha['n_presencas'],
+                faltas=linha['n_faltas'],
+                total_aulas=total_aulas[(linha['turma_id'], linha['ano'], linha['bimestre'])],
+            )
+            for linha in linhas
+        ]
+
+    with transaction.atomic():
+        resumos_qs.delete()
+        FrequenciaResumo.objects.bulk_create(resumos, batch_size=500)
+    return len(resumos)
+
+
+def agendar_recalculo(turma_id, periodo):
+    """Agenda o recálculo da partição (turma, (ano, bimestre)) para o commit.
+
+    Usado pelos sinais de Falta: várias gravações na mesma transação (ex.:
+    exclusão em cascata de um aluno) resultam em um único recálculo por
+    partição. Fora de transação o recálculo acontece imediatamente.
+    """
+    if not hasattr(_pendentes, 'chaves'):
+        _pendentes.chaves = set()
+    _pendentes.chaves.add((turma_id, periodo))
+    transaction.on_commit(_processar_pendentes)
+
+
+def _processar_pendentes():
+    chaves = getattr(_pendentes, 'chaves', set())
+    _pendentes.chaves = set()
+    por_turma = {}
+    for turma_id, periodo in chaves:
+        por_turma.setdefault(turma_id, set()).add(periodo)
+    for turma_id, periodos in por_turma.items():
+        recalcular_frequencia(turma_id, periodos)
+
+
+def total_faltas_aluno(aluno):
+    """Total de faltas do aluno em todas as turmas, lido do resumo."""
+    return aluno.frequencias.aggregate(total=Sum('faltas'))['total'] or 0
+
+
+def total_aulas_turma(turma):
+    """Número de datas distintas com chamada na turma, lido do resumo."""
+    if turma is None:
+        return 0
+    por_periodo = FrequenciaResumo.objects.filter(turma=turma).values('ano', 'bimestre').annotate(total=Max('total_aulas'))
+    return sum(linha['total'] for linha in por_periodo)
+
+
+def alunos_acima_do_limite(limite=LIMITE_FALTAS, turma_id=None, data_inicio=None, data_fim=None, por_gravidade=False):
+    """Alunos cuja fração de faltas na turma atual excede `limite`.
+
+    O total de aulas de cada turma é o número de datas distintas de chamada
+    no período. Faltas, total de aulas e a fração são calculados em uma única
+    consulta agrupada por (aluno, turma), com o total de aulas vindo de uma
+    subconsulta correlacionada por turma.
+
+    Retorna uma lista de dicionários com 'aluno' (nome), 'aluno_id', 'turma'
+    (objeto Turmas), 'faltas', 'total_aulas' e 'percentual'. A ordem padrão é
+    por turma e aluno; com `por_gravidade=True`, do maior percentual ao menor.
+    """
+    filtro = Q()
+    if turma_id is not None:
+        filtro &= Q(turma_id=turma_id)
+    if data_inicio is not None:
+        filtro &= Q(data__gte=data_inicio)
+    if data_fim is not None:
+        filtro &= Q(data__lte=data_fim)
+
+    aulas = (
+        Falta.objects
+        .filter(filtro, turma=OuterRef('turma_id'))
+        .order_by()
+        .values('turma')
+        .annotate(total=Count('data', distinct=True))
+        .values('total')
+    )
+    linhas = (
+        Falta.objects
+        .filter(filtro, aluno__class_choices=F('turma'))
+        .values('aluno_id', 'aluno__complet_name_aluno', 'turma_id')
+        .annotate(
+            n_faltas=Count('id', filter=Q(status='F')),
+            total_aulas=Subquery(aulas, output_field=IntegerField()),
+        )
+        .annotate(fracao=Cast('n_faltas', FloatField()) / F('total_aulas'))
+        .filter(total_aulas__gt=0, fracao__gt=limite)
+    )
+    if por_gravidade:
+        linhas = linhas.order_by('-fracao', 'aluno__complet_name_aluno', 'aluno_id')
+    else:
+        linhas = linhas.order_by('turma_id', 'aluno_id')
+    linhas = list(linhas)
+
+    turmas = Turmas.objects.in_bulk({linha['turma_id'] for linha in linhas})
+    return [
+        {
+            'aluno': linha['aluno__complet_name_aluno'],
+            'aluno_id': linha['aluno_id'],
+            'turma': turmas[linha['turma_id']],
+            'faltas': linha['n_faltas'],
+            'total_aulas': linha['total_aulas'],
+            'percentual': round(linha['n_faltas'] / linha['total_aulas'] * 100, 2),
+        }
+        for linha in linhas
+    ]
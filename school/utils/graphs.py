@@ -1,32 +1,147 @@
-import matplotlib.pyplot as plt
-import io
 import base64
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
 
-def gerar_grafico_barras(labels, values, cores, titulo, ylabel, ylim=(0, 100)):
-    # Cria uma nova figura do matplotlib com tamanho 8x4
-    plt.figure(figsize=(8,4))
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+
+# Gráficos já renderizados (chave: hash dos dados do gráfico), do mais antigo
+# para o mais recente. Compartilhado entre as threads do servidor.
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+FORMATOS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    # Séries do gráfico para desenhar no navegador (sem matplotlib)
+    'json': 'application/json',
+}
+
+
+class DadosGrafico(NamedTuple):
+    labels: list
+    values: list
+    cores: object
+    titulo: str
+    ylabel: str
+    ylim: tuple = (0, 100)
+
+
+def chave_grafico(labels, values, cores, titulo, ylabel, ylim=(0, 100), formato='png'):
+    """Hash dos dados do gráfico: muda sempre que a imagem mudaria."""
+    # Valores Decimal/int/float com o mesmo número geram a mesma chave
+    dados = [
+        [str(label) for label in labels],
+        [float(value) for value in values],
+        list(cores) if isinstance(cores, (list, tuple)) else cores,
+        titulo, ylabel, [float(limite) for limite in ylim], formato,
+    ]
+    return hashlib.sha256(json.dumps(dados, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _renderizar(labels, values, cores, titulo, ylabel, ylim, formato='png'):
+    # matplotlib só é carregado quando uma imagem é de fato renderizada: as
+    # páginas e os painéis (formato json) não precisam dele
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    # Figura própria (sem o estado global do pyplot): várias threads podem
+    # renderizar ao mesmo tempo
+    fig = Figure(figsize=(8, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     # Gera as barras do gráfico com as labels, valores e cores fornecidos
-    bars = plt.bar(labels, values, color=cores)
-    # Define o título do gráfico
-    plt.title(titulo)
-    # Define o label do eixo Y
-    plt.ylabel(ylabel)
-    # Define o limite do eixo Y
-    plt.ylim(*ylim)
+    bars = ax.bar(labels, values, color=cores)
+    # Define o título, o label e o limite do eixo Y
+    ax.set_title(titulo)
+    ax.set_ylabel(ylabel)
+    ax.set_ylim(*ylim)
     # Adiciona o valor acima de cada barra
     for bar, value in zip(bars, values):
-        plt.text(bar.get_x() + bar.get_width()/2, value + 2, f'{value:.0f}', ha='center', va='bottom')
-    # Cria um buffer de bytes para salvar a imagem
-    buf = io.BytesIO()
+        ax.text(bar.get_x() + bar.get_width()/2, value + 2, f'{value:.0f}', ha='center', va='bottom')
     # Ajusta o layout para não cortar elementos
-    plt.tight_layout()
-    # Salva o gráfico no buffer em formato PNG
-    plt.savefig(buf, format='png')
-    # Fecha a figura para liberar memória
-    plt.close()
-    # Codifica a imagem em base64 para uso em HTML
-    image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    # Fecha o buffer
-    buf.close()
-    # Retorna a string base64 da imagem
-    return image_base64
+    fig.tight_layout()
+    buf = io.BytesIO()
+    # Sem data nos metadados do SVG: os mesmos dados geram os mesmos bytes
+    fig.savefig(buf, format=formato, metadata={'Date': None} if formato == 'svg' else None)
+    return buf.getvalue()
+
+
+def grafico_barras(labels, values, cores, titulo, ylabel, ylim=(0, 100), formato='png'):
+    """Imagem (PNG ou SVG) do gráfico de barras, reaproveitada enquanto os dados forem os mesmos.
+
+    Os últimos GRAFICOS_CACHE_MAXIMO gráficos ficam em memória (LRU); um
+    acerto devolve os bytes sem renderizar nada.
+    """
+    chave = chave_grafico(labels, values, cores, titulo, ylabel, ylim, formato)
+    with _cache_lock:
+        imagem = _cache.get(chave)
+        if imagem is not None:
+            _cache.move_to_end(chave)
+            return imagem
+
+    # Renderiza fora do lock para não serializar as threads
+    imagem = _renderizar(labels, values, cores, titulo, ylabel, ylim, formato)
+
+    maximo = getattr(settings, 'GRAFICOS_CACHE_MAXIMO', 128)
+    with _cache_lock:
+        _cache[chave] = imagem
+        _cache.move_to_end(chave)
+        while len(_cache) > maximo:
+            _cache.popitem(last=False)
+    return imagem
+
+
+def limpar_cache_graficos():
+    with _cache_lock:
+        _cache.clear()
+
+
+def gerar_grafico_barras(labels, values, cores, titulo, ylabel, ylim=(0, 100)):
+    # Retorna a imagem PNG em base64 para uso em HTML (<img src="data:...">)
+    return base64.b64encode(grafico_barras(labels, values, cores, titulo, ylabel, ylim)).decode('utf-8')
+
+
+def dados_json(dados):
+    """Séries do gráfico em forma compacta para os painéis em React.
+
+    `atencao` marca as barras destacadas em vermelho (nota abaixo da mínima).
+    """
+    cores = dados.cores if isinstance(dados.cores, (list, tuple)) else [dados.cores] * len(dados.labels)
+    return {
+        'titulo': dados.titulo,
+        'eixo_y': dados.ylabel,
+        'ylim': [float(limite) for limite in dados.ylim],
+        'labels': [str(label) for label in dados.labels],
+        'valores': [round(float(value), 2) for value in dados.values],
+        'atencao': [cor == 'red' for cor in cores],
+    }
+
+
+def resposta_grafico(request, dados, formato):
+    """Resposta com o gráfico (`dados`: DadosGrafico) no formato pedido.
+
+    - png/svg: a imagem; json: as séries (`dados_json`), sem renderizar nada.
+    - ETag é o hash dos dados do gráfico (notas, nomes, cores...): enquanto
+      as notas não mudarem, If-None-Match igual responde 304 sem renderizar.
+    - Formato desconhecido ou gráfico sem dados: 404.
+    """
+    if formato not in FORMATOS or dados is None:
+        raise Http404("Gráfico não encontrado.")
+    etag = f'"{chave_grafico(*dados, formato=formato)}"'
+    cabecalhos = {
+        'ETag': etag,
+        # Notas de alunos: só o navegador guarda, revalidando a cada acesso
+        'Cache-Control': 'private, no-cache',
+    }
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        return HttpResponseNotModified(headers=cabecalhos)
+    if formato == 'json':
+        return JsonResponse(dados_json(dados), headers=cabecalhos, json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False})
+    return HttpResponse(grafico_barras(*dados, formato=formato), content_type=FORMATOS[formato], headers=cabecalhos)
@@ -0,0 +1,170 @@
+"""
+Fila de tarefas em segundo plano guardada no banco (modelo `Job`).
+
+- `enfileirar(tipo, parametros)` cria o job; `run_workers` reserva e
+  executa. Os tipos são funções registradas com `@tarefa('nome')` (ver
+  school/tarefas.py) que recebem o job e os parâmetros e devolvem
+  (nome_do_arquivo, conteúdo), onde conteúdo são bytes ou um iterável de
+  partes em bytes. O conteúdo é gravado em `Job.arquivo`. Tarefas que
+  gravam o resultado em outro lugar devolvem None.
+- Reserva: SELECT ... FOR UPDATE SKIP LOCKED onde o banco suporta
+  (PostgreSQL/MySQL) seguido de um UPDATE condicional ao status, então dois
+  workers nunca executam o mesmo job, inclusive no SQLite (sem FOR UPDATE;
+  o UPDATE condicional decide).
+- Falhas: o job volta para a fila após JOB_ESPERA_BASE * 2^(tentativa-1)
+  segundos, até JOB_MAX_TENTATIVAS tentativas; depois fica com status erro.
+  Jobs "executando" sem atualização há mais de JOB_TEMPO_LIMITE segundos
+  (worker que morreu) voltam para a fila.
+"""
+
+import tempfile
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import Job
+
+TAREFAS = {}
+
+
+def tarefa(nome):
+    """Registra a função como tipo de job `nome`."""
+    def registrar(funcao):
+        TAREFAS[nome] = funcao
+        return funcao
+    return registrar
+
+
+def _config(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+def enfileirar(tipo, parametros=None, usuario=None, disponivel_em=None):
+    """Cria um job pendente e o devolve (execução pelo comando run_workers).
+
+    `disponivel_em` adia o início do job (padrão: imediato).
+    """
+    if tipo not in TAREFAS:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    return Job.objects.create(
+        tipo=tipo,
+        parametros=parametros or {},
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+        max_tentativas=_config('JOB_MAX_TENTATIVAS', 3),
+        disponivel_em=disponivel_em or timezone.now(),
+    )
+
+
+def registrar_progresso(job, feitos, total, mensagem=None):
+    """Atualiza o percentual do job (só grava quando o número muda)."""
+    progresso = min(100, int(feitos * 100 / total)) if total else 0
+    if progresso == job.progresso and mensagem is None:
+        return
+    job.progresso = progresso
+    campos = {'progresso': progresso, 'atualizado_em': timezone.now()}
+    if mensagem is not None:
+        job.mensagem = campos['mensagem'] = mensagem
+    Job.objects.filter(id=job.id).update(**campos)
+
+
+def _reservar_candidato(candidato, worker, agora):
+    return Job.objects.filter(id=candidato, status=Job.PENDENTE).update(
+        status=Job.EXECUTANDO, worker=worker, iniciado_em=agora, atualizado_em=agora,
+        tentativas=F('tentativas') + 1, progresso=0,
+    )
+
+
+def reservar(worker):
+    """Reserva o próximo job disponível para `worker`; None se a fila estiver vazia."""
+    agora = timezone.now()
+    pendentes = (
+        Job.objects
+        .filter(status=Job.PENDENTE, disponivel_em__lte=agora)
+        .order_by('disponivel_em', 'id')
+        .values_list('id', flat=True)
+    )
+    while True:
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                candidato = pendentes.select_for_update(skip_locked=True).first()
+                reservado = candidato is not None and _reservar_candidato(candidato, worker, agora)
+        else:
+            # SQLite: sem FOR UPDATE (e uma transação de leitura que depois
+            # escreve falharia com "database is locked"); o UPDATE condicional
+            # decide sozinho qual worker fica com o job
+            candidato = pendentes.first()
+            reservado = candidato is not None and _reservar_candidato(candidato, worker, agora)
+        if candidato is None:
+            return None
+        if reservado:
+            return Job.objects.get(id=candidato)
+        # Outro worker levou este job entre a leitura e o UPDATE: tenta o próximo
+
+
+def _gravar_resultado(job, nome, conteudo):
+    if isinstance(conteudo, (bytes, bytearray)):
+        job.arquivo.save(nome, ContentFile(conteudo), save=False)
+        return
+    # Iterável de partes: passa por um arquivo temporário, sem juntar tudo em memória
+    with tempfile.TemporaryFile() as temporario:
+        for parte in conteudo:
+            temporario.write(parte)
+        temporario.seek(0)
+        job.arquivo.save(nome, File(temporario), save=False)
+
+
+def executar(job):
+    """Executa um job já reservado e grava o resultado ou a falha."""
+    try:
+        funcao = TAREFAS[job.tipo]
+        resultado = funcao(job, **job.parametros)
+        if resultado is not None:
+            _gravar_resultado(job, *resultado)
+    except Exception as erro:
+        detalhe = f"{type(erro).__name__}: {erro}"
+        if job.tentativas < job.max_tentativas:
+            espera = _config('JOB_ESPERA_BASE', 30) * 2 ** (job.tentativas - 1)
+            Job.objects.filter(id=job.id).update(
+                status=Job.PENDENTE, disponivel_em=timezone.now() + timedelta(seconds=espera),
+                mensagem=f"Tentativa {job.tentativas} falhou ({detalhe}); nova tentativa em {espera}s.",
+                atualizado_em=timezone.now(),
+            )
+        else:
+            Job.objects.filter(id=job.id).update(
+                status=Job.ERRO, concluido_em=timezone.now(), atualizado_em=timezone.now(),
+                mensagem=f"{detalhe}\n\n{traceback.format_exc()}",
+            )
+        return False
+
+    Job.objects.filter(id=job.id).update(
+        status=Job.CONCLUIDO, progresso=100, arquivo=job.arquivo.name or '', mensagem='',
+        concluido_em=timezone.now(), atualizado_em=timezone.now(),
+    )
+    return True
+
+
+def manter_vivos(jobs):
+    """Marca os jobs em execução como ativos, para não serem tomados por travados."""
+    Job.objects.filter(id__in=[job.id for job in jobs], status=Job.EXECUTANDO).update(atualizado_em=timezone.now())
+
+
+def recuperar_travados():
+    """Devolve à fila os jobs "executando" sem atualização há mais de JOB_TEMPO_LIMITE segundos.
+
+    Retorna quantos jobs foram recuperados.
+    """
+    limite = timezone.now() - timedelta(seconds=_config('JOB_TEMPO_LIMITE', 3600))
+    travados = Job.objects.filter(status=Job.EXECUTANDO, atualizado_em__lt=limite)
+    esgotados = travados.filter(tentativas__gte=F('max_tentativas')).update(
+        status=Job.ERRO, concluido_em=timezone.now(), mensagem='O worker parou durante a execução.',
+    )
+    devolvidos = travados.update(
+        status=Job.PENDENTE, disponivel_em=timezone.now(), mensagem='Devolvido à fila: o worker parou durante a execução.',
+    )
+    return esgotados + devolvidos
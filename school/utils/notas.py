@@ -0,0 +1,111 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from ..models import Nota
+from .desempenho import recalcular_desempenho
+
+NOTA_MINIMA = Decimal('0')
+NOTA_MAXIMA = Decimal('100')
+# Abaixo desta nota o aluno recebe o alerta de "atenção" (settings.NOTA_MINIMA_APROVACAO)
+NOTA_APROVACAO = Decimal(str(getattr(settings, 'NOTA_MINIMA_APROVACAO', 70)))
+
+
+def carregar_notas(alunos_ids, bimestre):
+    """Notas já lançadas dos alunos no bimestre, em uma única consulta.
+
+    Retorna {(aluno_id, materia_id): Nota}.
+    """
+    notas = (
+        Nota.objects
+        .filter(aluno_id__in=list(alunos_ids), bimestre=bimestre)
+        .only('id', 'aluno_id', 'materia_id', 'bimestre', 'nota', 'observacao')
+    )
+    return {(nota.aluno_id, nota.materia_id): nota for nota in notas}
+
+
+def celulas_do_post(post, chaves, sufixo):
+    """Lê do POST os campos nota_<sufixo>/obs_<sufixo> de cada célula.
+
+    `chaves` são pares (aluno_id, materia_id) e `sufixo(aluno_id, materia_id)`
+    devolve o sufixo usado nos nomes dos campos do formulário. Retorna
+    {(aluno_id, materia_id): (nota, observacao)} com os textos enviados.
+    """
+    celulas = {}
+    for aluno_id, materia_id in chaves:
+        nome = sufixo(aluno_id, materia_id)
+        celulas[(aluno_id, materia_id)] = (
+            post.get(f'nota_{nome}', '').strip(),
+            post.get(f'obs_{nome}', '').strip(),
+        )
+    return celulas
+
+
+def _validar_nota(texto):
+    try:
+        valor = Decimal(texto.replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError("Nota inválida.")
+    if not valor.is_finite() or not NOTA_MINIMA <= valor <= NOTA_MAXIMA:
+        raise ValueError(f"A nota deve estar entre {NOTA_MINIMA} e {NOTA_MAXIMA}.")
+    if valor != valor.quantize(Decimal('0.01')):
+        raise ValueError("Use no máximo duas casas decimais.")
+    return valor.quantize(Decimal('0.01'))
+
+
+def salvar_notas(bimestre, celulas):
+    """Grava as notas de um bimestre em uma única transação.
+
+    `celulas` é um dicionário {(aluno_id, materia_id): (nota, observacao)}
+    com os textos do formulário; células sem nota são ignoradas. As notas
+    existentes são carregadas em uma consulta e comparadas com as enviadas;
+    as novas e as alteradas são gravadas juntas com um upsert
+    (INSERT ... ON CONFLICT sobre a restrição única aluno/matéria/bimestre),
+    então dois envios simultâneos da mesma célula nunca geram duplicatas.
+    O resumo de desempenho dos alunos afetados é recalculado uma única vez,
+    na mesma transação.
+
+    Retorna uma tupla (criadas, atualizadas, erros), onde `erros` é
+    {(aluno_id, materia_id): mensagem}. Se houver qualquer erro nada é
+    gravado, para o formulário ser reenviado inteiro após a correção.
+    """
+    validas = {}
+    erros = {}
+    for chave, (texto, observacao) in celulas.items():
+        if not texto:
+            continue
+        try:
+            validas[chave] = (_validar_nota(texto), observacao)
+        except ValueError as erro:
+            erros[chave] = str(erro)
+    if erros:
+        return 0, 0, erros
+
+    with transaction.atomic():
+        existentes = carregar_notas({aluno_id for aluno_id, _ in validas}, bimestre)
+
+        novas = 0
+        alteradas = 0
+        gravar = []
+        for (aluno_id, materia_id), (valor, observacao) in validas.items():
+            nota = existentes.get((aluno_id, materia_id))
+            if nota is None:
+                novas += 1
+            elif nota.nota != valor or (nota.observacao or '') != observacao:
+                alteradas += 1
+            else:
+                continue
+            gravar.append(Nota(aluno_id=aluno_id, materia_id=materia_id, bimestre=bimestre, nota=valor, observacao=observacao))
+
+        if gravar:
+            Nota.objects.bulk_create(
+                gravar,
+                update_conflicts=True,
+                unique_fields=['aluno', 'materia', 'bimestre'],
+                update_fields=['nota', 'observacao'],
+            )
+            # bulk_create não dispara sinais: um único recálculo para todos os alunos afetados
+            recalcular_desempenho({nota.aluno_id for nota in gravar})
+
+    return novas, alteradas, {}
@@ -0,0 +1,504 @@
+"""
+Serviço de renderização de PDFs (WeasyPrint).
+
+Todas as views que geram PDF passam por aqui: `resposta_pdf` devolve a
+HttpResponse pronta e `renderizar_pdf` apenas os bytes.
+
+Notas importantes:
+- A renderização roda em um ProcessPoolExecutor com settings.PDF_WORKERS
+  processos. Cada processo importa o WeasyPrint e renderiza um documento
+  mínimo ao iniciar, então fontes e CSS padrão já estão carregados quando o
+  primeiro PDF real chega. Importar o WeasyPrint e montar o cache de fontes
+  custa mais que a maioria dos documentos da escola.
+- A fila é limitada: no máximo PDF_WORKERS + PDF_FILA_MAXIMA PDFs ao mesmo
+  tempo (renderizando + aguardando). Acima disso `FilaCheia` é levantada na
+  hora, e `resposta_pdf` responde 503 com Retry-After em vez de prender o
+  worker do servidor web.
+- Cada PDF tem PDF_TIMEOUT segundos: a requisição desiste do resultado
+  (`TempoEsgotado`) e o processo de renderização interrompe o documento
+  (SIGALRM), liberando a vaga para os próximos.
+- PDF_WORKERS = 0 renderiza no próprio processo (desenvolvimento, Windows).
+- `resposta_pdf` guarda cada PDF em MEDIA_ROOT/PDF_CACHE_DIR com o nome
+  igual ao hash SHA-256 do HTML: abrir de novo o mesmo boletim/contrato
+  custa o hash e a leitura do arquivo, sem passar pelo WeasyPrint. O hash
+  também é o ETag, então o navegador recebe 304 quando já tem o PDF. O
+  diretório é limitado a PDF_CACHE_TAMANHO_MAXIMO bytes, removendo os
+  arquivos usados há mais tempo (LRU pela data de modificação, atualizada a
+  cada acerto).
+"""
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+from collections import deque
+from concurrent import futures
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header, parse_etags
+
+from .arquivos_zip import gerar_zip
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_vagas = None
+
+DOCUMENTO_AQUECIMENTO = '<html><body><p>aquecimento</p></body></html>'
+
+
+class PDFIndisponivel(Exception):
+    """O PDF não pôde ser gerado agora (fila cheia, tempo esgotado ou processos caíram)."""
+
+
+class FilaCheia(PDFIndisponivel):
+    pass
+
+
+class TempoEsgotado(PDFIndisponivel):
+    pass
+
+
+def _workers():
+    return getattr(settings, 'PDF_WORKERS', 2)
+
+
+def _timeout():
+    return getattr(settings, 'PDF_TIMEOUT', 30)
+
+
+# ------------------- PROCESSOS DE RENDERIZAÇÃO -------------------
+
+def _inicializar_worker():
+    # Roda uma vez em cada processo novo: carrega o WeasyPrint e as fontes
+    from weasyprint import HTML
+    HTML(string=DOCUMENTO_AQUECIMENTO).write_pdf()
+
+
+def _estourou_tempo(signum, frame):
+    raise TempoEsgotado("Tempo limite de renderização do PDF excedido.")
+
+
+@contextmanager
+def _tempo_limite(timeout):
+    # No processo de renderização o tempo é controlado por SIGALRM, para um
+    # documento travado não ocupar o processo indefinidamente
+    alarme = timeout and hasattr(signal, 'setitimer')
+    if alarme:
+        signal.signal(signal.SIGALRM, _estourou_tempo)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        if alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _renderizar(html_string, base_url=None, timeout=None):
+    from weasyprint import HTML
+
+    with _tempo_limite(timeout):
+        return HTML(string=html_string, base_url=base_url).write_pdf()
+
+
+def _renderizar_combinado(htmls, base_url=None, timeout=None):
+    from weasyprint import HTML
+
+    # Layout de cada documento separado (cada um com seu CSS) e um único PDF com todas as páginas
+    with _tempo_limite(timeout):
+        documentos = [HTML(string=html_string, base_url=base_url).render() for html_string in htmls]
+        paginas = [pagina for documento in documentos for pagina in documento.pages]
+        return documentos[0].copy(paginas).write_pdf()
+
+
+def _obter_pool():
+    global _pool, _pool_pid, _vagas
+    with _lock:
+        # Depois de um fork (ex.: gunicorn --preload) o pool herdado não é utilizável
+        if _pool is None or _pool_pid != os.getpid():
+            workers = _workers()
+            _pool = futures.ProcessPoolExecutor(
+                max_workers=workers,
+                # spawn: os processos não herdam threads nem conexões do Django
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_inicializar_worker,
+            )
+            _pool_pid = os.getpid()
+            _vagas = threading.BoundedSemaphore(workers + getattr(settings, 'PDF_FILA_MAXIMA', 8))
+        return _pool, _vagas
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def encerrar():
+    """Encerra os processos de renderização (chamado também na saída do Python)."""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ------------------- API -------------------
+
+def _future_pronto(valor=None, erro=None):
+    future = futures.Future()
+    if erro is not None:
+        future.set_exception(erro)
+    else:
+        future.set_result(valor)
+    return future
+
+
+def _enfileirar(funcao, argumentos, bloquear, timeout):
+    if not _workers():
+        try:
+            return _future_pronto(funcao(*argumentos))
+        except Exception as erro:
+            return _future_pronto(erro=erro)
+
+    pool, vagas = _obter_pool()
+    conseguiu = vagas.acquire(timeout=_timeout()) if bloquear else vagas.acquire(blocking=False)
+    if not conseguiu:
+        raise FilaCheia("Muitos PDFs em geração no momento. Tente novamente em instantes.")
+    try:
+        future = pool.submit(funcao, *argumentos, timeout)
+    except BrokenProcessPool:
+        vagas.release()
+        _descartar_pool(pool)
+        raise PDFIndisponivel("Os processos de renderização de PDF foram reiniciados.")
+    except BaseException:
+        vagas.release()
+        raise
+    future.add_done_callback(lambda _: vagas.release())
+    future.pool = pool
+    future.timeout = timeout
+    return future
+
+
+def submeter(html_string, base_url=None, bloquear=False):
+    """Coloca um documento na fila e devolve um Future com os bytes do PDF.
+
+    Com `bloquear=False` (views) levanta `FilaCheia` se a fila estiver no
+    limite; com `bloquear=True` (lotes) espera até PDF_TIMEOUT segundos por
+    uma vaga. Use `resultado(future)` para obter os bytes.
+    """
+    return _enfileirar(_renderizar, (html_string, base_url), bloquear, _timeout())
+
+
+def resultado(future):
+    """Bytes do PDF de um Future de `submeter`, esperando no máximo o tempo limite do documento."""
+    try:
+        return future.result(timeout=getattr(future, 'timeout', _timeout()))
+    except futures.TimeoutError:
+        future.cancel()
+        raise TempoEsgotado("Tempo limite de geração do PDF excedido.")
+    except BrokenProcessPool:
+        _descartar_pool(future.pool)
+        raise PDFIndisponivel("Os processos de renderização de PDF foram reiniciados.")
+
+
+def renderizar_pdf(html_string, base_url=None):
+    """Renderiza o HTML e devolve os bytes do PDF.
+
+    Levanta `PDFIndisponivel` (ou as subclasses `FilaCheia`/`TempoEsgotado`)
+    quando o serviço não consegue atender; erros do próprio documento são
+    propagados como vieram do WeasyPrint.
+    """
+    return resultado(submeter(html_string, base_url))
+
+
+# ------------------- CACHE EM DISCO -------------------
+
+def _tamanho_maximo_cache():
+    return getattr(settings, 'PDF_CACHE_TAMANHO_MAXIMO', 200 * 1024 * 1024)
+
+
+def _diretorio_cache():
+    return os.path.join(settings.MEDIA_ROOT, getattr(settings, 'PDF_CACHE_DIR', 'pdf_cache'))
+
+
+def chave_pdf(html_string, base_url=None):
+    """Hash SHA-256 do documento: nome do arquivo no cache e ETag da resposta."""
+    conteudo = hashlib.sha256(html_string.encode('utf-8'))
+    if base_url:
+        conteudo.update(b'\0' + base_url.encode('utf-8'))
+    return conteudo.hexdigest()
+
+
+def _caminho_cache(chave):
+    # Subdiretório pelos dois primeiros caracteres para não acumular milhares de arquivos em um só
+    return os.path.join(_diretorio_cache(), chave[:2], f'{chave}.pdf')
+
+
+def _contar(evento):
+    # Contadores no cache do Django: compartilhados entre processos quando o
+    # backend é compartilhado (memcached/redis), por processo no LocMemCache
+    chave = f'pdf_cache:{evento}'
+    cache.add(chave, 0, timeout=None)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, 1, timeout=None)
+
+
+def _arquivos_cache():
+    arquivos = []
+    for raiz, _, nomes in os.walk(_diretorio_cache()):
+        for nome in nomes:
+            if not nome.endswith('.pdf'):
+                continue
+            caminho = os.path.join(raiz, nome)
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+    return arquivos
+
+
+def _limitar_cache():
+    arquivos = _arquivos_cache()
+    excesso = sum(tamanho for _, tamanho, _ in arquivos) - _tamanho_maximo_cache()
+    if excesso <= 0:
+        return
+    for _, tamanho, caminho in sorted(arquivos):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        excesso -= tamanho
+        if excesso <= 0:
+            break
+
+
+def _abrir_cache(chave):
+    try:
+        arquivo = open(_caminho_cache(chave), 'rb')
+    except FileNotFoundError:
+        return None
+    # Marca como usado agora (LRU); o arquivo já aberto sobrevive a uma remoção concorrente
+    try:
+        os.utime(arquivo.name)
+    except FileNotFoundError:
+        pass
+    return arquivo
+
+
+def _gravar_cache(chave, pdf):
+    caminho = _caminho_cache(chave)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    # Escreve em arquivo temporário e renomeia: leitores nunca veem um PDF pela metade
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    with os.fdopen(descritor, 'wb') as arquivo:
+        arquivo.write(pdf)
+    os.replace(temporario, caminho)
+    _limitar_cache()
+
+
+def pdf_em_cache(html_string, base_url=None):
+    """Bytes do PDF do documento, do cache em disco quando já renderizado.
+
+    Mesmas exceções de `renderizar_pdf` em caso de falta.
+    """
+    if not _tamanho_maximo_cache():
+        return renderizar_pdf(html_string, base_url)
+    chave = chave_pdf(html_string, base_url)
+    arquivo = _abrir_cache(chave)
+    if arquivo is not None:
+        _contar('acertos')
+        with arquivo:
+            return arquivo.read()
+    _contar('faltas')
+    pdf = renderizar_pdf(html_string, base_url)
+    _gravar_cache(chave, pdf)
+    return pdf
+
+
+def renderizar_lote(documentos, base_url=None):
+    """Renderiza vários documentos em paralelo, devolvendo-os na ordem de entrada.
+
+    `documentos` é um iterável de (identificador, html_string). Gera tuplas
+    (identificador, pdf, erro): `pdf` são os bytes (None se falhou) e `erro`
+    a exceção (None se deu certo), então uma falha não interrompe o lote.
+    Documentos já no cache não passam pelo WeasyPrint. No máximo
+    PDF_WORKERS documentos do lote ficam na fila ao mesmo tempo, deixando o
+    restante da fila para as views, e só esses PDFs ficam em memória.
+    """
+    usar_cache = bool(_tamanho_maximo_cache())
+    limite = max(1, _workers())
+    em_andamento = deque()
+
+    def concluir():
+        identificador, chave, future = em_andamento.popleft()
+        try:
+            pdf = resultado(future)
+        except Exception as erro:
+            return identificador, None, erro
+        if chave is not None:
+            _gravar_cache(chave, pdf)
+        return identificador, pdf, None
+
+    for identificador, html_string in documentos:
+        while len(em_andamento) >= limite:
+            yield concluir()
+        chave = chave_pdf(html_string, base_url) if usar_cache else None
+        arquivo = _abrir_cache(chave) if usar_cache else None
+        if arquivo is not None:
+            _contar('acertos')
+            with arquivo:
+                future = _future_pronto(arquivo.read())
+            chave = None
+        else:
+            if usar_cache:
+                _contar('faltas')
+            try:
+                future = submeter(html_string, base_url, bloquear=True)
+            except PDFIndisponivel as erro:
+                future = _future_pronto(erro=erro)
+        em_andamento.append((identificador, chave, future))
+
+    while em_andamento:
+        yield concluir()
+
+
+def zip_pdfs(documentos, base_url=None):
+    """ZIP em partes (ver `gerar_zip`) com os PDFs renderizados por `renderizar_lote`.
+
+    `documentos` é um iterável de (nome_do_arquivo, html_string), consumido
+    aos poucos. Documentos que não puderam ser gerados são listados em
+    ERROS.txt no fim do arquivo, sem interromper os demais.
+    """
+    erros = []
+
+    def arquivos():
+        for nome, pdf, erro in renderizar_lote(documentos, base_url):
+            if erro is not None:
+                erros.append(f'{nome}: {erro}')
+                continue
+            yield nome, pdf
+        if erros:
+            yield 'ERROS.txt', '\n'.join(erros).encode('utf-8')
+
+    return gerar_zip(arquivos())
+
+
+def renderizar_pdf_combinado(htmls, base_url=None):
+    """Um único PDF com as páginas de todos os documentos, na ordem.
+
+    O WeasyPrint não junta PDFs prontos, então a montagem é um único job (com
+    tempo limite proporcional ao número de documentos); o resultado fica no
+    cache como os demais PDFs. Mesmas exceções de `renderizar_pdf`.
+    """
+    htmls = list(htmls)
+    usar_cache = bool(_tamanho_maximo_cache())
+    if usar_cache:
+        chave = chave_pdf(''.join(chave_pdf(html_string, base_url) for html_string in htmls))
+        arquivo = _abrir_cache(chave)
+        if arquivo is not None:
+            _contar('acertos')
+            with arquivo:
+                return arquivo.read()
+        _contar('faltas')
+    future = _enfileirar(_renderizar_combinado, (htmls, base_url), False, _timeout() * max(1, len(htmls)))
+    pdf = resultado(future)
+    if usar_cache:
+        _gravar_cache(chave, pdf)
+    return pdf
+
+
+def estatisticas_cache():
+    """Acertos, faltas, número de arquivos e bytes ocupados pelo cache de PDFs."""
+    arquivos = _arquivos_cache()
+    return {
+        'acertos': cache.get('pdf_cache:acertos', 0),
+        'faltas': cache.get('pdf_cache:faltas', 0),
+        'arquivos': len(arquivos),
+        'bytes': sum(tamanho for _, tamanho, _ in arquivos),
+        'tamanho_maximo': _tamanho_maximo_cache(),
+    }
+
+
+def limpar_cache():
+    """Remove todos os PDFs do cache. Retorna o número de arquivos removidos."""
+    arquivos = _arquivos_cache()
+    for _, _, caminho in arquivos:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+    return len(arquivos)
+
+
+def resposta_indisponivel(erro):
+    """503 com Retry-After para quando o serviço de PDF não pôde atender."""
+    response = HttpResponse(str(erro), status=503, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = '5'
+    return response
+
+
+def resposta_pdf(request, html_string, filename, base_url=None, as_attachment=False):
+    """Resposta com o PDF do documento, servido do cache em disco quando possível.
+
+    - ETag é o hash do HTML; If-None-Match igual responde 304 sem ler o PDF.
+    - Acerto no cache: FileResponse do arquivo. Falta: renderiza, grava e serve.
+    - Serviço ocupado (`PDFIndisponivel`): 503 com Retry-After.
+    """
+    chave = chave_pdf(html_string, base_url)
+    etag = f'"{chave}"'
+    cabecalhos = {
+        'ETag': etag,
+        # Documentos com dados pessoais: só o navegador guarda, revalidando a cada acesso
+        'Cache-Control': 'private, no-cache',
+    }
+    if_none_match = request.headers.get('If-None-Match') if request is not None else None
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        _contar('acertos')
+        return HttpResponseNotModified(headers=cabecalhos)
+
+    arquivo = _abrir_cache(chave) if _tamanho_maximo_cache() else None
+    if arquivo is not None:
+        _contar('acertos')
+        response = FileResponse(arquivo, content_type='application/pdf', as_attachment=as_attachment, filename=filename)
+    else:
+        try:
+            pdf = renderizar_pdf(html_string, base_url)
+        except PDFIndisponivel as erro:
+            return resposta_indisponivel(erro)
+        if _tamanho_maximo_cache():
+            _contar('faltas')
+            _gravar_cache(chave, pdf)
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    for nome, valor in cabecalhos.items():
+        response[nome] = valor
+    return response
+
+
+def aquecer():
+    """Inicia todos os processos de renderização sem esperar o primeiro PDF.
+
+    Chamado no `ready()` do app quando settings.PDF_AQUECER é True.
+    """
+    if not _workers():
+        return
+    pool, vagas = _obter_pool()
+    # Um documento por processo: cada submit sem processo ocioso inicia um novo
+    for _ in range(_workers()):
+        if vagas.acquire(blocking=False):
+            future = pool.submit(_renderizar, DOCUMENTO_AQUECIMENTO)
+            future.add_done_callback(lambda _: vagas.release())
@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import ExtractYear
+
+from ..models import PeriodoLetivo
+
+# Calendário usado para anos sem PeriodoLetivo cadastrado: (mês, dia) de início
+# e fim de cada bimestre, cobrindo o ano inteiro para não descartar chamadas.
+CALENDARIO_PADRAO = {
+    1: ((1, 1), (3, 31)),
+    2: ((4, 1), (7, 31)),
+    3: ((8, 1), (9, 30)),
+    4: ((10, 1), (12, 31)),
+}
+
+# Tempo máximo (s) que um processo usa o calendário em memória sem reler o
+# banco; alterações feitas no próprio processo limpam o cache na hora (sinais).
+CACHE_SEGUNDOS = 300
+
+_cache = {'carregado_em': None, 'por_ano': {}}
+_lock = threading.Lock()
+
+
+class Periodo(NamedTuple):
+    ano: int
+    bimestre: Optional[int]
+    inicio: date
+    fim: date
+
+
+def limpar_cache_periodos():
+    """Descarta o calendário em memória; a próxima consulta relê o banco."""
+    with _lock:
+        _cache['carregado_em'] = None
+        _cache['por_ano'] = {}
+
+
+def _cadastrados():
+    with _lock:
+        carregado_em = _cache['carregado_em']
+        if carregado_em is None or time.monotonic() - carregado_em > CACHE_SEGUNDOS:
+            por_ano = {}
+            linhas = PeriodoLetivo.objects.order_by('data_inicio').values_list('ano', 'bimestre', 'data_inicio', 'data_fim')
+            for linha in linhas:
+                por_ano.setdefault(linha[0], []).append(Periodo(*linha))
+            _cache['por_ano'] = por_ano
+            _cache['carregado_em'] = time.monotonic()
+        return _cache['por_ano']
+
+
+def periodos_do_ano(ano):
+    """Bimestres do ano letivo em ordem de início (cadastrados ou padrão)."""
+    cadastrados = _cadastrados()
+    if ano in cadastrados:
+        return cadastrados[ano]
+    return [
+        Periodo(ano, bimestre, date(ano, *inicio), date(ano, *fim))
+        for bimestre, (inicio, fim) in CALENDARIO_PADRAO.items()
+    ]
+
+
+def periodo_da_data(data):
+    """Retorna (ano, bimestre) da data; bimestre é None fora dos bimestres.
+
+    O ano anterior também é consultado, para bimestres cadastrados que
+    terminam depois da virada do ano.
+    """
+    for periodo in periodos_do_ano(data.year - 1) + periodos_do_ano(data.year):
+        if periodo.inicio <= data <= periodo.fim:
+            return periodo.ano, periodo.bimestre
+    return data.year, None
+
+
+def intervalo_bimestre(ano, bimestre):
+    """(início, fim) do bimestre; para bimestre None, o ano civil inteiro."""
+    if bimestre is None:
+        return date(ano, 1, 1), date(ano, 12, 31)
+    for periodo in periodos_do_ano(ano):
+        if periodo.bimestre == bimestre:
+            return periodo.inicio, periodo.fim
+    raise ValueError(f"Bimestre {bimestre} não existe no calendário de {ano}.")
+
+
+def intervalo_ano_letivo(ano):
+    """(início, fim) do ano letivo: do início do 1º bimestre até a véspera do
+    início do ano seguinte, para incluir lançamentos feitos no recesso."""
+    periodos = periodos_do_ano(ano)
+    # Bimestres que atravessam a virada do ano pertencem ao ano em que começaram
+    inicio = max(periodos[0].inicio, periodos_do_ano(ano - 1)[-1].fim + timedelta(days=1))
+    fim = max(periodos[-1].fim, periodos_do_ano(ano + 1)[0].inicio - timedelta(days=1))
+    return inicio, fim
+
+
+def ano_letivo_atual():
+    return periodo_da_data(date.today())[0]
+
+
+def expressoes_periodo(primeiro_ano, ultimo_ano, campo='data'):
+    """Expressões SQL (ano, bimestre) equivalentes a periodo_da_data() para
+    as datas de `campo` entre os anos informados, para agrupar no banco."""
+    periodos = [p for ano in range(primeiro_ano - 1, ultimo_ano + 1) for p in periodos_do_ano(ano)]
+    ano = Case(
+        *[When(Q(**{f'{campo}__range': (p.inicio, p.fim)}), then=Value(p.ano)) for p in periodos],
+        default=ExtractYear(campo),
+        output_field=IntegerField(),
+    )
+    bimestre = Case(
+        *[When(Q(**{f'{campo}__range': (p.inicio, p.fim)}), then=Value(p.bimestre)) for p in periodos],
+        default=Value(None),
+        output_field=IntegerField(),
+    )
+    return ano, bimestre
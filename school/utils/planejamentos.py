@@ -0,0 +1,47 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Job
+from .jobs import enfileirar
+
+_pendentes = threading.local()
+
+TIPO_JOB = 'planejamento_documento'
+
+
+def agendar_documento(planejamento_id):
+    """Agenda a geração do documento do planejamento para depois do commit.
+
+    Usado pelos sinais de PlanejamentoSemanal e PlanejamentoItem: salvar o
+    planejamento e os seus itens na mesma transação (ex.: formulário do
+    admin com inlines) resulta em um único agendamento, já com os itens
+    gravados. O documento é gerado em segundo plano (job
+    'planejamento_documento', ver school/tarefas.py).
+    """
+    if not hasattr(_pendentes, 'planejamentos'):
+        _pendentes.planejamentos = set()
+    _pendentes.planejamentos.add(planejamento_id)
+    transaction.on_commit(_processar_pendentes)
+
+
+def _processar_pendentes():
+    planejamentos = getattr(_pendentes, 'planejamentos', set())
+    _pendentes.planejamentos = set()
+    for planejamento_id in planejamentos:
+        _enfileirar_documento(planejamento_id)
+
+
+def _enfileirar_documento(planejamento_id):
+    # Espera PLANEJAMENTO_ESPERA segundos por novas edições: enquanto houver
+    # um job pendente para o planejamento, cada edição só adia esse job, e a
+    # sequência de edições gera um único documento
+    disponivel_em = timezone.now() + timedelta(seconds=getattr(settings, 'PLANEJAMENTO_ESPERA', 10))
+    adiado = Job.objects.filter(
+        tipo=TIPO_JOB, status=Job.PENDENTE, parametros__planejamento_id=planejamento_id,
+    ).update(disponivel_em=disponivel_em)
+    if not adiado:
+        enfileirar(TIPO_JOB, {'planejamento_id': planejamento_id}, disponivel_em=disponivel_em)
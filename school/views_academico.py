@@ -1,19 +1,26 @@
 import io
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import render, get_object_or_404, redirect, reverse
-from django.http import HttpResponse
-from django.template.loader import render_to_string
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Avg 
+from django.db.models import Avg, Min, OuterRef, Subquery
 from django.utils import timezone 
-from weasyprint import HTML 
+from django.utils.text import slugify
 
 # Importações de Modelos e Forms
-from .models import Aluno, Turmas, Nota, Materia, Falta, Responsavel, Suspensao
+from .models import Aluno, DesempenhoResumo, Turmas, Nota, Materia, Falta, Responsavel, Suspensao
 from django.db.models import Q
 from .forms import SuspensaoForm
-from .utils.graphs import gerar_grafico_barras
+from .utils.graphs import DadosGrafico, resposta_grafico
+from .utils.boletins import boletins_turma, html_boletim, pdf_boletins, zip_boletins
+from .utils.contratos import html_contrato
+from .utils.pdf import PDFIndisponivel, resposta_indisponivel, resposta_pdf
+from .utils.notas import NOTA_APROVACAO, carregar_notas, celulas_do_post, salvar_notas
+from .utils.periodos import intervalo_ano_letivo
+from .views_analytics import estatisticas_notas
+from .views_jobs import pedido_assincrono, resposta_job
 
 # 🚨 CONSTANTES NECESSÁRIAS PARA TODAS AS VIEWS
 BIMESTRE_CHOICES = [(1, '1º Bimestre'), (2, '2º Bimestre'), (3, '3º Bimestre'), (4, '4º Bimestre')]
@@ -23,21 +30,9 @@ BIMESTRE_LABELS = {1: '1º Bimestre', 2: '2º Bimestre', 3: '3º Bimestre', 4: '
 # ------------------- CONTRATO / BOLETIM / GRÁFICOS -------------------
 
 def gerar_contrato_pdf(request, aluno_id):
-    aluno = get_object_or_404(Aluno, id=aluno_id)
-    responsavel = aluno.responsavel 
-    
-    context = {
-        'aluno': aluno,
-        'responsavel': responsavel
-    }
-    
-    html_string = render_to_string('contrato.html', context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="contrato_{aluno.id}.pdf"'
-    
-    pdf = HTML(string=html_string).write_pdf()
-    response.write(pdf)
-    return response
+    aluno = get_object_or_404(Aluno.objects.select_related('responsavel'), id=aluno_id)
+    html_string = html_contrato(aluno)
+    return resposta_pdf(request, html_string, f'contrato_{aluno.id}.pdf')
 
 
 def boletim_aluno(request, aluno_id):
@@ -71,116 +66,179 @@ def boletim_aluno(request, aluno_id):
 
 
 def boletim_aluno_pdf(request, aluno_id):
-    aluno = get_object_or_404(Aluno.objects.prefetch_related('notas__materia'), id=aluno_id)
+    aluno = get_object_or_404(Aluno, id=aluno_id)
     bimestre = request.GET.get('bimestre')
+    # Ano letivo opcional (?ano=2025): restringe notas e frequência ao calendário daquele ano
+    ano = request.GET.get('ano')
+    ano = int(ano) if ano and ano.isdigit() else None
     
     materias = list(Materia.objects.all().only('id', 'name_subject'))
-    notas = list(aluno.notas.select_related('materia').all())
-    
-    BIMESTRE_CHOICES = [(1, '1º Bimestre'), (2, '2º Bimestre'), (3, '3º Bimestre'), (4, '4º Bimestre')]
-    meses_bimestre = {1: [1, 2, 3], 2: [4, 5, 6], 3: [8, 9], 4: [10, 11]}
+    notas_qs = aluno.notas.all()
+    frequencias = aluno.frequencias.all()
+    if ano is not None:
+        notas_qs = notas_qs.filter(data_lancamento__range=intervalo_ano_letivo(ano))
+        frequencias = frequencias.filter(ano=ano)
+    notas = list(notas_qs)
+    frequencias = list(frequencias)
     
     if bimestre:
         try:
-            bimestre_int = int(bimestre)
-            notas_bim = [n for n in notas if n.bimestre == bimestre_int]
-            meses = meses_bimestre.get(bimestre_int, [])
-            faltas_bimestre = aluno.faltas.filter(status='F', data__month__in=meses).count()
-            presencas_bimestre = aluno.faltas.filter(status='P', data__month__in=meses).count()
-            total_chamadas = faltas_bimestre + presencas_bimestre
-            porcentagem_presenca = round((presencas_bimestre / total_chamadas) * 100, 1) if total_chamadas > 0 else None
-            
-            tem_alerta = any(nota.nota < 70 for nota in notas_bim)
-            for materia in materias:
-                materia.nota_bimestre = next((n for n in notas_bim if n.materia_id == materia.id), None)
-            
-            context = {
-                'aluno': aluno, 'notas': notas_bim, 'faltas_bimestre': faltas_bimestre,
-                'bimestre': bimestre_int, 'bimestre_choices': BIMESTRE_CHOICES, 'tem_alerta': tem_alerta,
-                'materias': materias, 'porcentagem_presenca': porcentagem_presenca,
-            }
-            html_string = render_to_string('boletim_select_bimestre.html', context)
+            html_string = html_boletim(aluno, materias, notas, frequencias, int(bimestre))
         except Exception:
             html_string = "<h1>Erro ao gerar PDF do boletim por bimestre.</h1>"
     else:
         # Lógica para Todos os Bimestres (Tabela consolidada)
-        notas_dict = {m.id: {} for m in materias}
-        for nota in notas:
-            notas_dict[nota.materia.id][nota.bimestre] = nota
-        materias_com_nota = [m for m in materias if notas_dict.get(m.id)]
-        for m in materias_com_nota:
-            m.notas_por_bimestre = notas_dict.get(m.id, {})
-        
-        tem_alerta = any(nota.nota < 70 for nota in notas)
-        total_faltas = aluno.faltas.filter(status='F').count()
-        context = {
-            'aluno': aluno, 'materias': materias_com_nota, 'tem_alerta': tem_alerta,
-            'bimestre': None, 'bimestre_choices': BIMESTRE_CHOICES, 'faltas_bimestre': total_faltas,
-        }
-        html_string = render_to_string('boletim_select_bimestre.html', context)
+        html_string = html_boletim(aluno, materias, notas, frequencias)
 
-    pdf = HTML(string=html_string).write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="boletim_{aluno.complet_name_aluno}.pdf"'
-    
+    return resposta_pdf(request, html_string, f'boletim_{aluno.complet_name_aluno}.pdf')
+
+
+def boletins_turma_pdf(request, turma_id):
+    """Boletins de todos os alunos da turma de uma vez.
+
+    Parâmetros GET opcionais:
+    - bimestre: boletim do bimestre (padrão: todos os bimestres)
+    - ano: ano letivo, como em boletim_aluno_pdf
+    - formato: 'zip' (padrão, um PDF por aluno, enviado à medida que fica
+      pronto) ou 'pdf' (um único PDF com todos os boletins)
+    - async=1: gera em segundo plano e responde 202 com o job (ver views_jobs)
+    """
+    turma = get_object_or_404(Turmas, id=turma_id)
+    bimestre = request.GET.get('bimestre')
+    bimestre = int(bimestre) if bimestre in ('1', '2', '3', '4') else None
+    ano = request.GET.get('ano')
+    ano = int(ano) if ano and ano.isdigit() else None
+    formato = request.GET.get('formato', 'zip')
+
+    if pedido_assincrono(request):
+        return resposta_job(request, 'boletins_turma', {
+            'turma_id': turma.id, 'bimestre': bimestre, 'ano': ano, 'formato': formato,
+        })
+
+    boletins = boletins_turma(turma.id, bimestre, ano)
+    if not boletins:
+        messages.warning(request, f'A turma {turma} não tem alunos.')
+        return redirect(request.META.get('HTTP_REFERER') or 'admin:school_turmas_changelist')
+
+    sufixo = f'_{bimestre}bim' if bimestre else ''
+    nome = f'boletins_{slugify(str(turma)) or turma.id}{sufixo}'
+    if formato == 'pdf':
+        try:
+            pdf = pdf_boletins(boletins)
+        except PDFIndisponivel as erro:
+            return resposta_indisponivel(erro)
+        response = HttpResponse(pdf, content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="{nome}.pdf"'
+        return response
+
+    response = StreamingHttpResponse(zip_boletins(boletins), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{nome}.zip"'
     return response
 
 
 # ------------------- GRÁFICOS DE DESEMPENHO -------------------
 
-def grafico_desempenho_aluno(request, aluno_id):
-    aluno = get_object_or_404(Aluno, id=aluno_id)
-    notas = aluno.notas.all()
-    
+# As páginas só trazem a URL do gráfico (<img src>); a imagem sai das views
+# *_imagem, em PNG ou SVG, com ETag calculado a partir dos dados do gráfico.
+# As mesmas views com formato json devolvem as séries para os painéis React.
+
+def _url_grafico(request, nome, objeto_id, formato='png', parametros=()):
+    url = reverse(f'school:{nome}', args=[objeto_id, formato])
+    consulta = request.GET.copy()
+    for chave in list(consulta):
+        if chave not in parametros:
+            del consulta[chave]
+    return f'{url}?{consulta.urlencode()}' if consulta else url
+
+
+def _grafico_aluno(aluno, notas):
     labels = [f'{n.materia.name_subject} - {n.get_bimestre_display()}' for n in notas]
     values = [float(n.nota) for n in notas]
     cores = ['red' if v < 70 else 'skyblue' for v in values]
-    
-    grafico_base64 = gerar_grafico_barras(labels, values, cores, f'Desempenho de {aluno.complet_name_aluno}', 'Nota', ylim=(0, 100))
+    return DadosGrafico(labels, values, cores, f'Desempenho de {aluno.complet_name_aluno}', 'Nota', (0, 100))
+
+
+def grafico_desempenho_aluno(request, aluno_id):
+    aluno = get_object_or_404(Aluno, id=aluno_id)
+    notas = aluno.notas.select_related('materia')
     
     context = {
-        'aluno': aluno, 'notas': notas, 'tem_alerta': any(n.nota < 70 for n in notas), 
-        'grafico': grafico_base64
+        'aluno': aluno, 'notas': notas, 'tem_alerta': notas.filter(nota__lt=70).exists(), 
+        'grafico_url': _url_grafico(request, 'grafico_desempenho_aluno_imagem', aluno.id),
     }
     return render(request, 'grafico_aluno.html', context) 
 
 
-def relatorio_turma(request, turma_id):
-    turma = get_object_or_404(Turmas, id=turma_id)
-    alunos = Aluno.objects.filter(class_choices=turma)
+def grafico_desempenho_aluno_imagem(request, aluno_id, formato):
+    aluno = get_object_or_404(Aluno, id=aluno_id)
+    return resposta_grafico(request, _grafico_aluno(aluno, aluno.notas.select_related('materia')), formato)
+
+
+def _nota_minima(request):
+    # Nota de aprovação: ?nota_minima= na URL ou NOTA_MINIMA_APROVACAO do settings
+    try:
+        valor = Decimal(request.GET['nota_minima'].replace(',', '.'))
+    except (KeyError, InvalidOperation):
+        return NOTA_APROVACAO
+    return valor if valor.is_finite() else NOTA_APROVACAO
+
+
+def _relatorio_turma(turma, nota_minima):
+    # Média e menor nota de cada aluno em uma única consulta agrupada; a
+    # tabela e o gráfico saem do mesmo resultado
+    alunos = (
+        Aluno.objects
+        .filter(class_choices=turma)
+        .annotate(media=Avg('notas__nota'), menor_nota=Min('notas__nota'))
+        .order_by('id')
+    )
     relatorio = []
-    nomes = []
-    medias = []
-    cores = []
-    
     for aluno in alunos:
-        media = aluno.media_notas() 
-        notas = Nota.objects.filter(aluno=aluno) 
-        atencao = any(n.nota < 70 for n in notas)
-        
-        relatorio.append({'aluno': aluno, 'media': media, 'atencao': atencao})
-        nomes.append(aluno.complet_name_aluno)
-        medias.append(float(media) if media is not None else 0)
-        cores.append('red' if atencao else 'skyblue')
-    
-    grafico = None
-    if nomes:
-        grafico = gerar_grafico_barras(nomes, medias, cores, f'Desempenho da Turma {turma.class_name}', 'Média')
+        atencao = aluno.menor_nota is not None and aluno.menor_nota < nota_minima
+        relatorio.append({'aluno': aluno, 'media': aluno.media, 'atencao': atencao})
+    return relatorio
+
+
+def _grafico_turma(turma, relatorio):
+    if not relatorio:
+        return None
+    nomes = [item['aluno'].complet_name_aluno for item in relatorio]
+    medias = [float(item['media']) if item['media'] is not None else 0 for item in relatorio]
+    cores = ['red' if item['atencao'] else 'skyblue' for item in relatorio]
+    return DadosGrafico(nomes, medias, cores, f'Desempenho da Turma {turma.class_name}', 'Média')
+
+
+def relatorio_turma(request, turma_id):
+    turma = get_object_or_404(Turmas, id=turma_id)
+    nota_minima = _nota_minima(request)
+    relatorio = _relatorio_turma(turma, nota_minima)
+
+    grafico_url = None
+    if relatorio:
+        grafico_url = _url_grafico(request, 'relatorio_turma_grafico', turma.id, parametros=('nota_minima',))
     
     return render(request, 'relatorio_turma.html', {
-        'turma': turma, 'relatorio': relatorio, 'grafico': grafico,
+        'turma': turma, 'relatorio': relatorio, 'grafico_url': grafico_url,
+        'nota_minima': nota_minima, 'tem_atencao': any(item['atencao'] for item in relatorio),
+        # Estatísticas por disciplina da turma (views_analytics)
+        'estatisticas': estatisticas_notas('materia', turma_id=turma.id, nota_minima=nota_minima),
     })
 
 
-def grafico_disciplina(request, materia_id):
-    materia = get_object_or_404(Materia, id=materia_id)
-    
-    alunos_com_nota = Aluno.objects.filter(
+def relatorio_turma_grafico(request, turma_id, formato):
+    turma = get_object_or_404(Turmas, id=turma_id)
+    return resposta_grafico(request, _grafico_turma(turma, _relatorio_turma(turma, _nota_minima(request))), formato)
+
+
+def _alunos_com_nota(materia):
+    return Aluno.objects.filter(
         notas__materia=materia
     ).annotate(
         media_disciplina=Avg('notas__nota')
     ).order_by('complet_name_aluno')
-    
+
+
+def _grafico_disciplina(materia, alunos_com_nota):
     nomes = []
     medias = []
     cores = []
@@ -191,18 +249,44 @@ def grafico_disciplina(request, materia_id):
         medias.append(float(media))
         cores.append('red' if media < 70 else 'skyblue')
 
-    grafico_base64 = None
-    if nomes:
-        grafico_base64 = gerar_grafico_barras(nomes, medias, cores, f'Desempenho em {materia.name_subject}', 'Nota Média', ylim=(0, 100))
+    if not nomes:
+        return None
+    return DadosGrafico(nomes, medias, cores, f'Desempenho em {materia.name_subject}', 'Nota Média', (0, 100))
+
+
+def grafico_disciplina(request, materia_id):
+    materia = get_object_or_404(Materia, id=materia_id)
+    alunos_com_nota = _alunos_com_nota(materia)
+
+    grafico_url = None
+    if alunos_com_nota.exists():
+        grafico_url = _url_grafico(request, 'grafico_disciplina_imagem', materia.id)
     
-    context = {'materia': materia, 'grafico': grafico_base64, 'alunos_com_nota': alunos_com_nota}
+    context = {
+        'materia': materia, 'grafico_url': grafico_url, 'alunos_com_nota': alunos_com_nota,
+        # Estatísticas da disciplina no colégio e em cada turma (views_analytics)
+        'resumo': next(iter(estatisticas_notas('materia', materia_id=materia.id)), None),
+        'estatisticas': estatisticas_notas('turma', materia_id=materia.id),
+    }
     return render(request, 'grafico_disciplina.html', context)
 
 
+def grafico_disciplina_imagem(request, materia_id, formato):
+    materia = get_object_or_404(Materia, id=materia_id)
+    return resposta_grafico(request, _grafico_disciplina(materia, _alunos_com_nota(materia)), formato)
+
+
 # ------------------- SELEÇÃO E NAVEGAÇÃO -------------------
 
 def desempenho_aluno_select(request):
-    alunos = Aluno.objects.all().order_by('complet_name_aluno')
+    # Média geral lida do resumo de desempenho na mesma consulta (sem agregação por aluno)
+    alunos = Aluno.objects.annotate(
+        media_geral=Subquery(
+            DesempenhoResumo.objects
+            .filter(aluno=OuterRef('pk'), materia__isnull=True, bimestre__isnull=True)
+            .values('media')[:1]
+        )
+    ).order_by('complet_name_aluno')
     return render(request, 'desempenho_aluno_select.html', {'alunos': alunos})
 
 
@@ -282,36 +366,67 @@ def notas_por_aluno_select_turma(request):
     return render(request, 'admin/notas_por_aluno/select_turma.html', {'turmas': turmas})
 
 
+def _bimestre_valido(valor):
+    # Bimestre vindo de GET/POST: int de 1 a 4, ou None
+    return int(valor) if valor and valor.isdigit() and int(valor) in BIMESTRE_LABELS else None
+
+
+def _celula(nota_existente, enviada=None, erro=None):
+    # Valores exibidos em uma célula do formulário: os enviados (após erro) ou os já lançados
+    if enviada is not None:
+        nota, obs = enviada
+    elif nota_existente is not None:
+        nota, obs = nota_existente.nota, nota_existente.observacao or ''
+    else:
+        nota, obs = '', ''
+    return {'nota': nota, 'obs': obs, 'erro': erro}
+
+
 def notas_por_aluno_form_batch(request):
     turma_id = request.GET.get('turma')
     turma = get_object_or_404(Turmas, id=turma_id)
-    alunos = Aluno.objects.filter(class_choices=turma).order_by('complet_name_aluno')
-    materias = Materia.objects.all().order_by('name_subject')
+    alunos = list(Aluno.objects.filter(class_choices=turma).order_by('complet_name_aluno'))
+    materias = list(Materia.objects.all().order_by('name_subject'))
+    bimestre = _bimestre_valido(request.POST.get('bimestre') or request.GET.get('bimestre'))
     
     mensagem = ''
+    enviadas = {}
+    erros = {}
     if request.method == 'POST':
-        bimestre = request.POST.get('bimestre')
-        for aluno in alunos:
-            for materia in materias:
-                nota_val = request.POST.get(f'nota_{aluno.id}_{materia.id}')
-                obs_val = request.POST.get(f'obs_{aluno.id}_{materia.id}')
-                if nota_val:
-                    Nota.objects.update_or_create(
-                        aluno=aluno,
-                        materia=materia,
-                        bimestre=int(bimestre),
-                        defaults={
-                            'nota': nota_val,
-                            'observacao': obs_val,
-                        }
-                    )
-        messages.success(request, 'Notas salvas com sucesso!')
-        return redirect('admin:school_alunonotas_changelist')
+        if bimestre is None:
+            messages.error(request, 'Selecione um bimestre válido.')
+        else:
+            chaves = [(aluno.id, materia.id) for aluno in alunos for materia in materias]
+            enviadas = celulas_do_post(request.POST, chaves, lambda aluno_id, materia_id: f'{aluno_id}_{materia_id}')
+            criadas, atualizadas, erros = salvar_notas(bimestre, enviadas)
+            if not erros:
+                messages.success(request, f'Notas salvas com sucesso! {criadas} nota(s) lançada(s), {atualizadas} atualizada(s).')
+                return redirect('admin:school_alunonotas_changelist')
+            messages.error(request, f'{len(erros)} nota(s) inválida(s). Nada foi salvo; corrija os campos destacados.')
+
+    # Grade pré-preenchida com as notas do bimestre (uma consulta) ou com o que foi enviado
+    existentes = carregar_notas([aluno.id for aluno in alunos], bimestre) if bimestre and not enviadas else {}
+    linhas = [
+        {
+            'aluno': aluno,
+            'celulas': [
+                dict(materia=materia, **_celula(
+                    existentes.get((aluno.id, materia.id)),
+                    enviadas.get((aluno.id, materia.id)),
+                    erros.get((aluno.id, materia.id)),
+                ))
+                for materia in materias
+            ],
+        }
+        for aluno in alunos
+    ]
         
     return render(request, 'admin/notas_por_aluno/form_notas_batch.html', {
         'turma': turma,
         'alunos': alunos,
         'materias': materias,
+        'linhas': linhas,
+        'bimestre': bimestre,
         'bimestre_choices': BIMESTRE_CHOICES,
         'mensagem': mensagem,
     })
@@ -343,26 +458,31 @@ def notas_por_aluno_form(request):
     bimestre = request.GET.get('bimestre')
     turma = get_object_or_404(Turmas, id=turma_id)
     aluno = get_object_or_404(Aluno, id=aluno_id)
-    materias = Materia.objects.all().order_by('name_subject')
+    materias = list(Materia.objects.all().order_by('name_subject'))
     
-    bimestre_label = BIMESTRE_LABELS.get(int(bimestre), bimestre) if bimestre else 'Geral'
+    bimestre_label = BIMESTRE_LABELS.get(int(bimestre), bimestre) if bimestre and bimestre.isdigit() else 'Geral'
+    bimestre_int = _bimestre_valido(bimestre)
     
     mensagem = ''
+    enviadas = {}
+    erros = {}
     if request.method == 'POST':
-        for materia in materias:
-            nota_val = request.POST.get(f'nota_{materia.id}')
-            obs_val = request.POST.get(f'obs_{materia.id}')
-            if nota_val:
-                Nota.objects.update_or_create(
-                    aluno=aluno,
-                    materia=materia,
-                    bimestre=int(bimestre),
-                    defaults={
-                        'nota': nota_val,
-                        'observacao': obs_val,
-                    }
-                )
-        messages.success(request, 'Notas salvas com sucesso!')
+        if bimestre_int is None:
+            messages.error(request, 'Selecione um bimestre válido.')
+        else:
+            chaves = [(aluno.id, materia.id) for materia in materias]
+            enviadas = celulas_do_post(request.POST, chaves, lambda _, materia_id: materia_id)
+            criadas, atualizadas, erros = salvar_notas(bimestre_int, enviadas)
+            if erros:
+                messages.error(request, f'{len(erros)} nota(s) inválida(s). Nada foi salvo; corrija os campos destacados.')
+            else:
+                messages.success(request, 'Notas salvas com sucesso!')
+                enviadas = {}
+
+    existentes = carregar_notas([aluno.id], bimestre_int) if bimestre_int and not enviadas else {}
+    for materia in materias:
+        chave = (aluno.id, materia.id)
+        materia.celula = _celula(existentes.get(chave), enviadas.get(chave), erros.get(chave))
         
     return render(request, 'admin/notas_por_aluno/form_notas.html', {
         'turma': turma,
@@ -0,0 +1,246 @@
+"""
+Módulo de estatísticas de notas.
+
+Calcula, para cada grupo de notas (turma, disciplina, bimestre ou aluno),
+média, mediana, desvio padrão, percentis, taxa de aprovação, histograma e a
+variação da média de um bimestre para o seguinte.
+
+Notas importantes:
+- As notas são lidas com uma única consulta `values_list` (já convertidas
+  para float no banco) e colocadas em arrays NumPy; todas as estatísticas de todos os
+  grupos saem de operações vetorizadas (bincount, lexsort), sem laços em
+  Python por grupo ou por nota. Com 100 mil notas o cálculo leva ~50 ms e
+  a consulta completa ~200 ms no SQLite (ver
+  school/scripts/benchmark_estatisticas.py).
+- `estatisticas_notas` é a API usada pelas views (relatorio_turma,
+  grafico_disciplina); `estatisticas_notas_json` expõe o mesmo resultado em
+  JSON para os painéis.
+- Valores ausentes (ex.: bimestre sem notas) aparecem como None.
+- O NumPy é importado dentro das funções, na primeira estatística
+  calculada, e não ao carregar as rotas (ver
+  school/scripts/benchmark_inicializacao.py).
+"""
+
+import math
+
+from django.db import connections
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.http import JsonResponse
+
+from .models import Aluno, Materia, Nota, Turmas
+from .utils.notas import NOTA_APROVACAO
+
+# Percentis calculados para cada grupo (o 50 é a mediana)
+PERCENTIS = (25, 50, 75, 90)
+# Bordas do histograma: faixas de 10 pontos de 0 a 100 (100 entra na última)
+BORDAS_HISTOGRAMA = tuple(range(0, 101, 10))
+BIMESTRES = (1, 2, 3, 4)
+
+# Campo de Nota usado como chave de cada agrupamento
+AGRUPAMENTOS = {
+    'turma': 'aluno__class_choices',
+    'materia': 'materia',
+    'bimestre': 'bimestre',
+    'aluno': 'aluno',
+}
+
+
+def calcular_estatisticas(grupos, bimestres, valores, nota_minima=NOTA_APROVACAO):
+    """Estatísticas de todos os grupos de uma vez.
+
+    Entrada (arrays NumPy do mesmo tamanho, uma posição por nota):
+    - grupos: chave inteira do grupo da nota
+    - bimestres: bimestre da nota (0 quando não informado)
+    - valores: nota (float)
+
+    Saída: dicionário de arrays alinhados com `chaves` (ordem crescente):
+    'chaves', 'n', 'media', 'desvio_padrao', 'percentis' (grupos x PERCENTIS),
+    'taxa_aprovacao', 'histograma' (grupos x faixas), 'medias_bimestre'
+    (grupos x 4, NaN sem notas) e 'variacao_bimestre' (grupos x 3).
+    """
+    import numpy as np
+
+    chaves, codigos = np.unique(grupos, return_inverse=True)
+    n_grupos = len(chaves)
+    contagem = np.bincount(codigos, minlength=n_grupos)
+
+    media = np.bincount(codigos, weights=valores, minlength=n_grupos) / contagem
+    # Desvio padrão populacional em duas passadas (estável numericamente)
+    desvios = (valores - media[codigos]) ** 2
+    desvio_padrao = np.sqrt(np.bincount(codigos, weights=desvios, minlength=n_grupos) / contagem)
+
+    # Percentis por interpolação linear (como np.percentile) sobre as notas
+    # ordenadas dentro de cada grupo
+    ordenados = valores[np.lexsort((valores, codigos))]
+    inicios = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    percentis = np.empty((n_grupos, len(PERCENTIS)))
+    for coluna, p in enumerate(PERCENTIS):
+        posicao = inicios + (contagem - 1) * (p / 100)
+        abaixo = np.floor(posicao).astype(int)
+        acima = np.ceil(posicao).astype(int)
+        percentis[:, coluna] = ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+
+    aprovadas = np.bincount(codigos, weights=(valores >= float(nota_minima)), minlength=n_grupos)
+    taxa_aprovacao = aprovadas / contagem
+
+    n_faixas = len(BORDAS_HISTOGRAMA) - 1
+    faixa = np.clip(np.searchsorted(np.array(BORDAS_HISTOGRAMA), valores, side='right') - 1, 0, n_faixas - 1)
+    histograma = np.bincount(codigos * n_faixas + faixa, minlength=n_grupos * n_faixas).reshape(n_grupos, n_faixas)
+
+    com_bimestre = np.isin(bimestres, BIMESTRES)
+    celula = codigos[com_bimestre] * len(BIMESTRES) + (bimestres[com_bimestre] - 1)
+    tamanho = n_grupos * len(BIMESTRES)
+    soma_bimestre = np.bincount(celula, weights=valores[com_bimestre], minlength=tamanho).reshape(n_grupos, -1)
+    n_bimestre = np.bincount(celula, minlength=tamanho).reshape(n_grupos, -1)
+    medias_bimestre = np.divide(
+        soma_bimestre, n_bimestre, out=np.full(soma_bimestre.shape, np.nan), where=n_bimestre > 0
+    )
+
+    return {
+        'chaves': chaves,
+        'n': contagem,
+        'media': media,
+        'desvio_padrao': desvio_padrao,
+        'percentis': percentis,
+        'taxa_aprovacao': taxa_aprovacao,
+        'histograma': histograma,
+        'medias_bimestre': medias_bimestre,
+        'variacao_bimestre': np.diff(medias_bimestre, axis=1),
+    }
+
+
+def _lista(valores):
+    import numpy as np
+
+    # Arredonda para 2 casas e troca NaN por None (null no JSON, "-" nos templates)
+    arredondados = np.round(valores, 2).astype(object)
+    arredondados[np.isnan(valores)] = None
+    return arredondados.tolist()
+
+
+def _rotulos(agrupar_por, chaves):
+    ids = [int(chave) for chave in chaves]
+    if agrupar_por == 'materia':
+        return {pk: m.name_subject for pk, m in Materia.objects.in_bulk(ids).items()}
+    if agrupar_por == 'turma':
+        return {pk: str(t) for pk, t in Turmas.objects.in_bulk(ids).items()}
+    if agrupar_por == 'aluno':
+        return dict(Aluno.objects.filter(id__in=ids).values_list('id', 'complet_name_aluno'))
+    return {b: f'{b}º Bimestre' for b in ids}
+
+
+def estatisticas_notas(agrupar_por='materia', turma_id=None, materia_id=None, bimestre=None, nota_minima=NOTA_APROVACAO):
+    """Estatísticas das notas filtradas, uma entrada por grupo.
+
+    Entrada:
+    - agrupar_por: 'turma', 'materia', 'bimestre' ou 'aluno'
+    - turma_id / materia_id / bimestre: filtros opcionais (turma é a turma
+      atual do aluno)
+    - nota_minima: nota de aprovação usada na taxa de aprovação
+
+    Saída: lista de dicionários ordenada pela chave do grupo, com 'id',
+    'nome', 'n', 'media', 'mediana', 'desvio_padrao', 'percentis'
+    ({'p25': ...}), 'taxa_aprovacao' (0 a 100), 'histograma' (contagens por
+    faixa de 10 pontos), 'medias_bimestre' ({1: ...}) e 'variacao_bimestre'
+    ({'1-2': ...}).
+
+    Custo: uma consulta para as notas e uma para os nomes dos grupos.
+    """
+    import numpy as np
+
+    campo = AGRUPAMENTOS[agrupar_por]
+    notas = Nota.objects.filter(**{f'{campo}__isnull': False})
+    if turma_id is not None:
+        notas = notas.filter(aluno__class_choices_id=turma_id)
+    if materia_id is not None:
+        notas = notas.filter(materia_id=materia_id)
+    if bimestre is not None:
+        notas = notas.filter(bimestre=bimestre)
+
+    linhas = notas.annotate(
+        valor=Cast('nota', FloatField()),
+        bimestre_ou_zero=Coalesce('bimestre', Value(0)),
+    ).values_list(campo, 'bimestre_ou_zero', 'valor')
+    # Executa o SQL do queryset direto no cursor: as linhas já chegam como
+    # números e vão para o NumPy sem os conversores por linha do ORM
+    sql, params = linhas.query.sql_with_params()
+    with connections[linhas.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        dados = np.array(cursor.fetchall(), dtype=float).reshape(-1, 3)
+    if not len(dados):
+        return []
+
+    resultado = calcular_estatisticas(
+        dados[:, 0].astype(np.int64), dados[:, 1].astype(np.int64), dados[:, 2], nota_minima
+    )
+    rotulos = _rotulos(agrupar_por, resultado['chaves'])
+
+    # Colunas convertidas para listas Python de uma vez, antes de montar os grupos
+    chaves = resultado['chaves'].tolist()
+    n = resultado['n'].tolist()
+    media = _lista(resultado['media'])
+    desvio_padrao = _lista(resultado['desvio_padrao'])
+    percentis = _lista(resultado['percentis'])
+    taxa_aprovacao = _lista(resultado['taxa_aprovacao'] * 100)
+    histograma = resultado['histograma'].tolist()
+    medias_bimestre = _lista(resultado['medias_bimestre'])
+    variacao_bimestre = _lista(resultado['variacao_bimestre'])
+    mediana = PERCENTIS.index(50)
+
+    estatisticas = []
+    for i, chave in enumerate(chaves):
+        estatisticas.append({
+            'id': chave,
+            'nome': rotulos.get(chave, str(chave)),
+            'n': n[i],
+            'media': media[i],
+            'mediana': percentis[i][mediana],
+            'desvio_padrao': desvio_padrao[i],
+            'percentis': {f'p{p}': valor for p, valor in zip(PERCENTIS, percentis[i])},
+            'taxa_aprovacao': taxa_aprovacao[i],
+            'histograma': histograma[i],
+            'medias_bimestre': dict(zip(BIMESTRES, medias_bimestre[i])),
+            'variacao_bimestre': {
+                f'{b}-{b + 1}': valor for b, valor in zip(BIMESTRES, variacao_bimestre[i])
+            },
+        })
+    return estatisticas
+
+
+def _inteiro(request, nome):
+    valor = request.GET.get(nome)
+    return int(valor) if valor and valor.isdigit() else None
+
+
+def estatisticas_notas_json(request):
+    """Estatísticas de notas em JSON.
+
+    Parâmetros GET opcionais:
+    - agrupar: turma, materia (padrão), bimestre ou aluno
+    - turma, materia, bimestre: filtros por id / número
+    - nota_minima: nota de aprovação (padrão settings.NOTA_MINIMA_APROVACAO)
+    """
+    agrupar_por = request.GET.get('agrupar', 'materia')
+    if agrupar_por not in AGRUPAMENTOS:
+        return JsonResponse({'erro': f"agrupar deve ser um de: {', '.join(AGRUPAMENTOS)}"}, status=400)
+    try:
+        nota_minima = float(request.GET.get('nota_minima', NOTA_APROVACAO))
+    except ValueError:
+        nota_minima = NOTA_APROVACAO
+    if not math.isfinite(float(nota_minima)):
+        nota_minima = NOTA_APROVACAO
+
+    estatisticas = estatisticas_notas(
+        agrupar_por,
+        turma_id=_inteiro(request, 'turma'),
+        materia_id=_inteiro(request, 'materia'),
+        bimestre=_inteiro(request, 'bimestre'),
+        nota_minima=nota_minima,
+    )
+    return JsonResponse({
+        'agrupar': agrupar_por,
+        'nota_minima': float(nota_minima),
+        'faixas_histograma': list(BORDAS_HISTOGRAMA),
+        'grupos': estatisticas,
+    })
@@ -0,0 +1,134 @@
+"""
+API de leitura (Django REST Framework) para o front-end React.
+
+Rotas em api/ (ver school/urls.py): alunos, turmas, materias, professores e
+responsaveis, só leitura e com usuário autenticado (JWT, ver api/token/).
+
+- Paginação por cursor (`PaginacaoCursor`): a próxima página é buscada por
+  "id > último id", sem OFFSET e sem COUNT, então a página 1000 custa o
+  mesmo que a primeira. Use os links `next`/`previous` da resposta;
+  ?page_size= até 200.
+- ?fields=id,complet_name_aluno devolve só esses campos.
+- Filtros: ?nome= (contém, sem diferenciar maiúsculas) em todos os recursos
+  e ?turma=<id> em alunos, professores e responsaveis; veja cada view.
+- As relações exibidas vêm no próprio SELECT (select_related): uma página
+  de qualquer recurso é uma única consulta (ver
+  school/scripts/verificar_consultas_api.py).
+"""
+
+from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Aluno, Materia, Professor, Responsavel, Turmas
+from .serializers import (
+    AlunoSerializer, MateriaSerializer, ProfessorSerializer, ResponsavelSerializer, TurmaSerializer,
+)
+
+
+class PaginacaoCursor(CursorPagination):
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class LeituraViewSet(viewsets.ReadOnlyModelViewSet):
+    """Base dos recursos: autenticação, paginação, ?fields= e filtros.
+
+    Subclasses definem `queryset` (com select_related das relações
+    exibidas), `campo_nome` (filtro ?nome=) e, se houver, `campo_turma`
+    (filtro ?turma=).
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = PaginacaoCursor
+    campo_nome = None
+    campo_turma = None
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.request.query_params.get('fields')
+        if fields:
+            kwargs['campos'] = [campo.strip() for campo in fields.split(',') if campo.strip()]
+        return super().get_serializer(*args, **kwargs)
+
+    def _inteiro(self, nome):
+        valor = self.request.query_params.get(nome)
+        return int(valor) if valor and valor.isdigit() else None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        nome = self.request.query_params.get('nome')
+        if nome and self.campo_nome:
+            queryset = queryset.filter(**{f'{self.campo_nome}__icontains': nome})
+        turma = self._inteiro('turma')
+        if turma is not None and self.campo_turma:
+            queryset = queryset.filter(**{self.campo_turma: turma})
+        return queryset
+
+
+class AlunoViewSet(LeituraViewSet):
+    """Alunos com turma e responsável. Filtros: ?nome=, ?turma=, ?responsavel=."""
+    queryset = Aluno.objects.select_related('class_choices', 'responsavel')
+    serializer_class = AlunoSerializer
+    campo_nome = 'complet_name_aluno'
+    campo_turma = 'class_choices_id'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        responsavel = self._inteiro('responsavel')
+        if responsavel is not None:
+            queryset = queryset.filter(responsavel_id=responsavel)
+        return queryset
+
+
+class TurmaViewSet(LeituraViewSet):
+    """Turmas. Filtros: ?nome= (ano, ex. 1°) e ?itinerario= (N, CN, DS, DJ)."""
+    queryset = Turmas.objects.all()
+    serializer_class = TurmaSerializer
+    campo_nome = 'class_name'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        itinerario = self.request.query_params.get('itinerario')
+        if itinerario:
+            queryset = queryset.filter(itinerary_name=itinerario)
+        return queryset
+
+
+class MateriaViewSet(LeituraViewSet):
+    """Disciplinas. Filtro: ?nome= (sigla, ex. MAT)."""
+    queryset = Materia.objects.all()
+    serializer_class = MateriaSerializer
+    campo_nome = 'name_subject'
+
+
+class ProfessorViewSet(LeituraViewSet):
+    """Professores com disciplina e turma. Filtros: ?nome=, ?turma=, ?materia=."""
+    queryset = Professor.objects.select_related('subject_choice', 'class_choices')
+    serializer_class = ProfessorSerializer
+    campo_nome = 'complet_name_prof'
+    campo_turma = 'class_choices_id'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        materia = self._inteiro('materia')
+        if materia is not None:
+            queryset = queryset.filter(subject_choice_id=materia)
+        return queryset
+
+
+class ResponsavelViewSet(LeituraViewSet):
+    """Responsáveis. Filtros: ?nome= e ?turma= (responsáveis de alunos da turma)."""
+    queryset = Responsavel.objects.all()
+    serializer_class = ResponsavelSerializer
+    campo_nome = 'complet_name'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        turma = self._inteiro('turma')
+        if turma is not None:
+            # Subconsulta em vez de JOIN: sem linhas repetidas e sem DISTINCT
+            queryset = queryset.filter(
+                id__in=Aluno.objects.filter(class_choices_id=turma).values('responsavel_id')
+            )
+        return queryset
@@ -1,16 +1,16 @@
 from django.shortcuts import get_object_or_404, render
-from django.http import FileResponse, HttpResponse
+from django.http import FileResponse
 from django.db.models import Count
 from django.template.loader import render_to_string
-from weasyprint import HTML # Necessário para faltas_aluno_pdf
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from reportlab.lib import colors
 import io
 from datetime import datetime # Para faltas_datas
 
 # Importar modelos
 from .models import Falta, Turmas, Aluno
+from .utils.frequencia import LIMITE_FALTAS, alunos_acima_do_limite, total_aulas_turma, total_faltas_aluno
+from .utils.pdf import resposta_pdf
+from .utils.periodos import intervalo_ano_letivo, intervalo_bimestre
+from .views_jobs import pedido_assincrono, resposta_job
 from django.shortcuts import render
 # ------------------- FALTAS DO ALUNO (HTML e PDF) -------------------
 
@@ -20,13 +20,13 @@ def faltas_aluno_pdf(request, aluno_id):
     
     aluno = get_object_or_404(Aluno, id=aluno_id)
     faltas = Falta.objects.filter(aluno=aluno, status='F')
-    total_faltas = faltas.count()
+    total_faltas = total_faltas_aluno(aluno)
     turma = aluno.class_choices
     
     # Calcular total de aulas (assumindo que o total de chamadas é o total de aulas)
-    total_aulas = Falta.objects.filter(turma=turma).values('data').distinct().count()
+    total_aulas = total_aulas_turma(turma)
     percentual = (total_faltas / total_aulas * 100) if total_aulas > 0 else 0
-    passou_limite = percentual > 25
+    passou_limite = percentual > LIMITE_FALTAS * 100
     
     html_string = render_to_string('faltas_aluno_pdf.html', {
         'aluno': aluno,
@@ -37,23 +37,20 @@ def faltas_aluno_pdf(request, aluno_id):
         'passou_limite': passou_limite
     })
     
-    pdf = HTML(string=html_string).write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
     # Abrir no navegador
-    response['Content-Disposition'] = f'inline; filename="faltas_{aluno.complet_name_aluno}.pdf"'
-    return response
+    return resposta_pdf(request, html_string, f'faltas_{aluno.complet_name_aluno}.pdf')
 
 
 def faltas_aluno(request, aluno_id):
     """Exibe a página HTML de faltas do aluno (visualização)."""
     aluno = get_object_or_404(Aluno, id=aluno_id)
     faltas = Falta.objects.filter(aluno=aluno, status='F')
-    total_faltas = faltas.count()
+    total_faltas = total_faltas_aluno(aluno)
     turma = aluno.class_choices
     
-    total_aulas = Falta.objects.filter(turma=turma).values('data').distinct().count()
+    total_aulas = total_aulas_turma(turma)
     percentual = (total_faltas / total_aulas * 100) if total_aulas > 0 else 0
-    passou_limite = percentual > 25
+    passou_limite = percentual > LIMITE_FALTAS * 100
     
     return render(request, 'faltas_aluno.html', {
         'aluno': aluno,
@@ -67,28 +64,44 @@ def faltas_aluno(request, aluno_id):
 
 # ------------------- RELATÓRIOS POR TURMA (PDF) -------------------
 
-def relatorio_faltas_pdf(request, turma_id):
-    """Relatório de faltas de uma turma em PDF (ReportLab)."""
-    turma = get_object_or_404(Turmas, id=turma_id)
-    faltas = Falta.objects.filter(turma=turma, status='F')
+def _pdf_chamadas_turma(turma_id, status, titulo_observacao, cor_cabecalho, cor_linhas):
+    """Bytes do PDF (ReportLab) com as chamadas da turma no status dado ('F' ou 'P').
+
+    As cores são nomes de reportlab.lib.colors (ex.: 'grey').
+    """
+    # ReportLab só é carregado quando um relatório é gerado
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+    registros = (
+        Falta.objects.filter(turma_id=turma_id, status=status)
+        .select_related('aluno', 'professor')
+        .order_by('data', 'aluno__complet_name_aluno')
+    )
     
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     elements = []
 
-    data = [['Data', 'Aluno', 'Professor', 'Observação']]
-    for falta in faltas:
-        data.append([falta.data, falta.aluno.complet_name_aluno, falta.professor.username if falta.professor else '', falta.observacao or ''])
+    data = [['Data', 'Aluno', 'Professor', titulo_observacao]]
+    for registro in registros.iterator(chunk_size=2000):
+        data.append([
+            registro.data,
+            registro.aluno.complet_name_aluno,
+            registro.professor.username if registro.professor else '',
+            registro.observacao or ''
+        ])
 
     table = Table(data)
     table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), getattr(colors, cor_cabecalho)),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('FONTSIZE', (0, 0), (-1, 0), 14),
         ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('BACKGROUND', (0, 1), (-1, -1), getattr(colors, cor_linhas)),
         ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
         ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
         ('FONTSIZE', (0, 1), (-1, -1), 12),
@@ -96,67 +109,82 @@ def relatorio_faltas_pdf(request, turma_id):
     ]))
     elements.append(table)
     doc.build(elements)
+    return buffer.getvalue()
 
-    buffer.seek(0)
-    return FileResponse(buffer, as_attachment=False, filename=f'relatorio_faltas_{turma.class_name}.pdf')
 
+def pdf_faltas_turma(turma_id):
+    return _pdf_chamadas_turma(turma_id, 'F', 'Observação', 'grey', 'beige')
 
-def relatorio_presenca_pdf(request, turma_id):
-    """Relatório de presenças de uma turma em PDF (ReportLab)."""
-    turma = get_object_or_404(Turmas, id=turma_id)
-    presencas = Falta.objects.filter(turma=turma, status='P')
-    
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
 
-    data = [['Data', 'Aluno', 'Professor', 'Observação (Presença)']]
-    for p in presencas: 
-        data.append([
-            p.data, 
-            p.aluno.complet_name_aluno, 
-            p.professor.username if p.professor else '', 
-            p.observacao or ''
-        ])
+def pdf_presencas_turma(turma_id):
+    return _pdf_chamadas_turma(turma_id, 'P', 'Observação (Presença)', 'darkgreen', 'lightgreen')
 
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen), 
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-    ]))
-    elements.append(table)
-    doc.build(elements)
 
-    buffer.seek(0)
+def relatorio_faltas_pdf(request, turma_id):
+    """Relatório de faltas de uma turma em PDF (ReportLab); ?async=1 gera em segundo plano."""
+    turma = get_object_or_404(Turmas, id=turma_id)
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_faltas_turma_pdf', {'turma_id': turma.id})
+    buffer = io.BytesIO(pdf_faltas_turma(turma.id))
+    return FileResponse(buffer, as_attachment=False, filename=f'relatorio_faltas_{turma.class_name}.pdf')
+
+
+def relatorio_presenca_pdf(request, turma_id):
+    """Relatório de presenças de uma turma em PDF (ReportLab); ?async=1 gera em segundo plano."""
+    turma = get_object_or_404(Turmas, id=turma_id)
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_presencas_turma_pdf', {'turma_id': turma.id})
+    buffer = io.BytesIO(pdf_presencas_turma(turma.id))
     return FileResponse(buffer, as_attachment=False, filename=f'relatorio_presenca_{turma.class_name}.pdf')
 
 
 # ------------------- RELATÓRIOS EXCEDENTES / DATAS (HTML) -------------------
 
 def relatorio_faltas_excedidas(request):
-    """Exibe uma lista de alunos que excederam o limite de faltas (25%)."""
-    alunos_excedentes = []
-    turmas = Turmas.objects.all()
-    for turma in turmas:
-        alunos = Aluno.objects.filter(class_choices=turma)
-        total_aulas = Falta.objects.filter(turma=turma).values('data').distinct().count()
-        for aluno in alunos:
-            faltas = Falta.objects.filter(aluno=aluno, turma=turma, status='F').count()
-            if total_aulas > 0 and faltas / total_aulas > 0.25:
-                alunos_excedentes.append({
-                    'aluno': aluno.complet_name_aluno, 'turma': turma, 'faltas': faltas,
-                    'percentual': round(faltas / total_aulas * 100, 2)
-                })
-    return render(request, 'relatorio_faltas.html', {'alunos_excedentes': alunos_excedentes})
+    """Exibe uma lista de alunos que excederam o limite de faltas.
+
+    Parâmetros GET opcionais:
+    - limite: percentual de faltas tolerado (padrão 25)
+    - turma: id da turma
+    - inicio / fim: período das chamadas (AAAA-MM-DD)
+    - ano / bimestre: período pelo calendário letivo (sem bimestre, o ano
+      letivo inteiro); inicio/fim têm precedência
+    - ordem=gravidade: ordena do maior percentual de faltas ao menor
+    """
+    try:
+        limite = float(request.GET.get('limite', LIMITE_FALTAS * 100)) / 100
+    except ValueError:
+        limite = LIMITE_FALTAS
+    turma_id = request.GET.get('turma')
+    turma_id = int(turma_id) if turma_id and turma_id.isdigit() else None
+
+    periodo = {}
+    ano = request.GET.get('ano')
+    if ano and ano.isdigit():
+        bimestre = request.GET.get('bimestre')
+        try:
+            if bimestre and bimestre.isdigit():
+                periodo['data_inicio'], periodo['data_fim'] = intervalo_bimestre(int(ano), int(bimestre))
+            else:
+                periodo['data_inicio'], periodo['data_fim'] = intervalo_ano_letivo(int(ano))
+        except ValueError:
+            periodo = {}
+    for campo, chave in (('data_inicio', 'inicio'), ('data_fim', 'fim')):
+        valor = request.GET.get(chave)
+        if valor:
+            try:
+                periodo[campo] = datetime.strptime(valor, '%Y-%m-%d').date()
+            except ValueError:
+                pass
+
+    alunos_excedentes = alunos_acima_do_limite(
+        limite=limite, turma_id=turma_id,
+        por_gravidade=request.GET.get('ordem') == 'gravidade', **periodo
+    )
+    return render(request, 'relatorio_faltas.html', {
+        'alunos_excedentes': alunos_excedentes,
+        'limite': round(limite * 100, 2),
+    })
 
 
 def faltas_datas(request):
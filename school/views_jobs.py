@@ -0,0 +1,63 @@
+"""
+Acompanhamento das tarefas em segundo plano (modelo `Job`).
+
+- As views de relatórios pesados aceitam ?async=1: em vez de gerar o
+  arquivo na requisição, chamam `resposta_job`, que enfileira o job e
+  responde 202 com o endereço de acompanhamento (também no cabeçalho
+  Location).
+- `job_status` (jobs/<chave>/) devolve status, progresso e, quando
+  concluído, o link de download; `job_download` serve o arquivo gerado.
+- Os jobs são executados pelo comando `python manage.py run_workers`.
+"""
+
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from .models import Job
+from .utils.jobs import enfileirar
+
+
+def pedido_assincrono(request):
+    return request.GET.get('async') == '1'
+
+
+def _dados_job(request, job):
+    dados = {
+        'job': str(job.chave),
+        'tipo': job.tipo,
+        'status': job.status,
+        'progresso': job.progresso,
+        'mensagem': job.mensagem.split('\n', 1)[0] if job.mensagem else '',
+        'tentativas': job.tentativas,
+        'criado_em': job.criado_em.isoformat(),
+        'concluido_em': job.concluido_em.isoformat() if job.concluido_em else None,
+        'status_url': request.build_absolute_uri(reverse('school:job_status', args=[job.chave])),
+        'download_url': None,
+    }
+    if job.status == Job.CONCLUIDO and job.arquivo:
+        dados['download_url'] = request.build_absolute_uri(reverse('school:job_download', args=[job.chave]))
+    return dados
+
+
+def resposta_job(request, tipo, parametros):
+    """Enfileira o job e responde 202 Accepted com os dados de acompanhamento."""
+    job = enfileirar(tipo, parametros, usuario=getattr(request, 'user', None))
+    dados = _dados_job(request, job)
+    response = JsonResponse(dados, status=202)
+    response['Location'] = dados['status_url']
+    return response
+
+
+def job_status(request, chave):
+    """Status e progresso do job em JSON (para o front-end consultar periodicamente)."""
+    job = get_object_or_404(Job, chave=chave)
+    return JsonResponse(_dados_job(request, job))
+
+
+def job_download(request, chave):
+    """Arquivo gerado pelo job concluído."""
+    job = get_object_or_404(Job, chave=chave)
+    if job.status != Job.CONCLUIDO or not job.arquivo:
+        raise Http404("O resultado deste job ainda não está disponível.")
+    return FileResponse(job.arquivo.open('rb'), filename=job.nome_arquivo)
@@ -2,36 +2,183 @@
 Módulo de relatórios de faltas e presenças.
 
 Este módulo fornece views para gerar relatórios de presença/falta em CSV
-(compatível com Excel) e em PDF (usando ReportLab). Ele inclui também uma
-view para selecionar a turma antes de gerar relatórios por turma.
+(compatível com Excel) e em PDF (usando ReportLab), além da exportação de
+notas de uma turma por bimestre em CSV. Ele inclui também uma view para
+selecionar a turma antes de gerar relatórios por turma.
 
 Notas importantes:
-- CSV: gerado em memória com BOM UTF-8 para garantir compatibilidade com
-    Excel. O conteúdo é servido inline (cabeçalho Content-Disposition: inline).
+- CSV: transmitido em partes (StreamingHttpResponse) com BOM UTF-8 no
+    início para garantir compatibilidade com Excel. As linhas são lidas do
+    banco sob demanda com `.iterator(chunk_size=...)`, então a memória não
+    cresce com o tamanho da escola. O conteúdo é servido inline (cabeçalho
+    Content-Disposition: inline).
 - PDF: gerado com ReportLab e servido inline para que o navegador exiba o
     PDF como o boletim.
-- Dependências externas: reportlab (para PDF). Em versões anteriores usamos
-    pandas/openpyxl para XLSX; aqui a exportação é CSV para evitar dependências
-    pesadas. Se reativar uso de pandas/openpyxl, instale os pacotes.
+- ?async=1 em qualquer relatório: em vez do arquivo, responde 202 com o
+    endereço de acompanhamento de um job (school/tarefas.py) executado pelo
+    comando run_workers; o arquivo pronto é baixado de jobs/<chave>/download/.
+    `csv_frequencia`, `pdf_frequencia` e `csv_notas_turma` geram o conteúdo
+    tanto para as views quanto para os jobs.
+- Dependências externas: reportlab (para PDF), importado dentro de
+    `pdf_frequencia` para não pesar na inicialização dos workers. Em versões
+    anteriores usamos pandas/openpyxl para XLSX; aqui a exportação é CSV para
+    evitar dependências pesadas. Se reativar uso de pandas/openpyxl, importe-os
+    dentro das funções que os usam.
 
 Inputs/Outputs (contrato mínimo):
 - As views recebem `request` e, quando aplicável, `turma_id`.
-- Retornam `HttpResponse` (CSV) ou `FileResponse` (PDF) com conteúdo inline.
+- Retornam `StreamingHttpResponse` (CSV) ou `FileResponse` (PDF) com conteúdo inline.
 
 Para desenvolvedores: editar as funções abaixo com cuidado; qualquer alteração
 no formato do CSV ou na tabela do PDF deve preservar o uso de `utf-8-sig`
 no CSV e `Content-Disposition: inline` para experiência consistente.
 """
 
+import codecs
+import csv
 import io
-import pandas as pd
-from django.http import FileResponse, HttpResponse
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from .models import Falta
+from itertools import groupby
+from typing import NamedTuple
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.db.models import Sum
+from .models import FrequenciaResumo, Materia, Nota
 from .models import Turmas
+from .utils.periodos import intervalo_ano_letivo
+from .views_jobs import pedido_assincrono, resposta_job
+
+# Cabeçalho comum a todos os relatórios de frequência (CSV e PDF)
+CABECALHO_FREQUENCIA = ["Aluno", "Presenças", "Faltas", "% Presença", "Situação"]
+# Percentual mínimo de presença para aprovação
+PRESENCA_MINIMA = 80
+# Linhas buscadas por ida ao banco nas exportações CSV
+CHUNK_SIZE = 2000
+
+
+class LinhaFrequencia(NamedTuple):
+    """Totais de frequência de um aluno, na ordem das colunas do relatório."""
+    aluno_id: int
+    nome: str
+    presencas: int
+    faltas: int
+
+    @property
+    def total_aulas(self):
+        return self.presencas + self.faltas
+
+    @property
+    def porcentagem(self):
+        return (self.presencas / self.total_aulas * 100) if self.total_aulas > 0 else 0
+
+    @property
+    def situacao(self):
+        return "Aprovado" if self.porcentagem >= PRESENCA_MINIMA else "Reprovado"
+
+    def como_linha(self):
+        """Valores prontos para uma linha do CSV ou da tabela do PDF."""
+        return [self.nome, self.presencas, self.faltas, f"{self.porcentagem:.1f}%", self.situacao]
+
+
+def agregar_frequencia(turma_id=None, chunk_size=CHUNK_SIZE):
+    """Agrega presenças e faltas por aluno em uma única consulta.
+
+    Entrada:
+    - turma_id: int opcional; sem ele, agrega o colégio inteiro.
+    - chunk_size: linhas lidas do cursor por vez (`QuerySet.iterator`).
+
+    Saída:
+    - iterador de `LinhaFrequencia`, ordenado pelo nome do aluno.
+
+    Observações:
+    - Agrupa por `aluno_id` (alunos homônimos não são mesclados) sobre o
+      resumo `FrequenciaResumo`, que já guarda as contagens por bimestre.
+    """
+    resumos = FrequenciaResumo.objects.all()
+    if turma_id is not None:
+        resumos = resumos.filter(turma_id=turma_id)
+    linhas = (
+        resumos
+        .values_list('aluno_id', 'aluno__complet_name_aluno')
+        .annotate(presencas_total=Sum('presencas'), faltas_total=Sum('faltas'))
+        .order_by('aluno__complet_name_aluno', 'aluno_id')
+    )
+    for aluno_id, nome, presencas, faltas in linhas.iterator(chunk_size=chunk_size):
+        yield LinhaFrequencia(aluno_id, nome, presencas, faltas)
+
+
+class _Echo:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de acumulá-la."""
+
+    def write(self, value):
+        return value
+
+
+def partes_csv(cabecalho, linhas):
+    """Partes em bytes de um CSV (BOM UTF-8 + cabeçalho + linhas).
+
+    `linhas` é um iterável preguiçoso de listas; cada linha é escrita e
+    codificada apenas quando a próxima parte é pedida.
+    """
+    writer = csv.writer(_Echo())
+    # BOM UTF-8 primeiro, para o Excel reconhecer a codificação (equivale a utf-8-sig)
+    yield codecs.BOM_UTF8
+    yield writer.writerow(cabecalho).encode('utf-8')
+    for linha in linhas:
+        yield writer.writerow(linha).encode('utf-8')
+
+
+def _csv_streaming(partes, filename):
+    """Transmite um CSV (partes de `partes_csv`) sem montá-lo em memória."""
+    response = StreamingHttpResponse(partes, content_type='text/csv; charset=utf-8')
+    # Servir inline (o navegador pode abrir ou oferecer opção) — semelhante ao comportamento do boletim
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
+
+def csv_frequencia(turma_id=None):
+    """Partes do CSV de frequência (colégio inteiro ou uma turma)."""
+    linhas = (linha.como_linha() for linha in agregar_frequencia(turma_id))
+    return partes_csv(CABECALHO_FREQUENCIA, linhas)
+
+
+def _csv_frequencia(turma_id, filename):
+    return _csv_streaming(csv_frequencia(turma_id), filename)
+
+
+def pdf_frequencia(turma_id=None):
+    """Bytes do PDF (ReportLab) do relatório de frequência."""
+    # ReportLab só é carregado quando um relatório é gerado
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elementos = [Paragraph("Relatório de Faltas e Presenças", styles['Title']), Spacer(1, 12)]
+
+    dados_tabela = [CABECALHO_FREQUENCIA]
+    dados_tabela.extend(linha.como_linha() for linha in agregar_frequencia(turma_id))
+
+    tabela = Table(dados_tabela, repeatRows=1)
+    tabela.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ]))
+    elementos.append(tabela)
+    doc.build(elementos)
+    return buffer.getvalue()
+
+
+def _pdf_frequencia(turma_id, filename):
+    response = FileResponse(io.BytesIO(pdf_frequencia(turma_id)), as_attachment=False, filename=filename)
+    # Forçar exibição inline no navegador (como feito em boletim_aluno_pdf)
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    return response
+
 
 def gerar_relatorio_presenca_excel(request):
     """Gera um relatório de presenças/faltas em CSV.
@@ -40,45 +187,18 @@ def gerar_relatorio_presenca_excel(request):
     - request: HttpRequest (não usa parâmetros URL)
 
     Saída:
-    - HttpResponse com content_type 'text/csv' contendo CSV UTF-8 com BOM
-      (compatível com Excel). O arquivo é servido inline para permitir visualização
+    - StreamingHttpResponse com content_type 'text/csv' contendo CSV UTF-8
+      com BOM (compatível com Excel). O arquivo é servido inline para permitir visualização
       direta no navegador ou abrir no Excel.
 
     Observações:
-    - A função calcula presenças e faltas por aluno a partir do modelo `Falta`.
-    - Em caso de necessidade de colunas adicionais, inclua-as no cabeçalho
-      e na criação de `rows` abaixo.
+    - As linhas vêm de `agregar_frequencia` (uma consulta para o colégio).
+    - Em caso de necessidade de colunas adicionais, inclua-as em
+      `CABECALHO_FREQUENCIA` e em `LinhaFrequencia.como_linha`.
     """
-    # Gerar CSV em memória (compatível com Excel) — evita dependência do openpyxl
-    import csv
-
-    # Cabeçalho
-    header = ["Aluno", "Presenças", "Faltas", "% Presença", "Situação"]
-
-    # Dados
-    rows = []
-    alunos = Falta.objects.values('aluno__complet_name_aluno').distinct()
-    for aluno in alunos:
-        nome = aluno['aluno__complet_name_aluno']
-        total_presencas = Falta.objects.filter(aluno__complet_name_aluno=nome, status='P').count()
-        total_faltas = Falta.objects.filter(aluno__complet_name_aluno=nome, status='F').count()
-        total_aulas = total_presencas + total_faltas
-        porcentagem = (total_presencas / total_aulas * 100) if total_aulas > 0 else 0
-        status = "Aprovado" if porcentagem >= 80 else "Reprovado"
-        rows.append([nome, total_presencas, total_faltas, f"{porcentagem:.1f}%", status])
-
-    # Escrever CSV em memória com BOM para Excel (UTF-8)
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(header)
-    for r in rows:
-        writer.writerow(r)
-
-    csv_data = output.getvalue().encode('utf-8-sig')
-    response = HttpResponse(csv_data, content_type='text/csv; charset=utf-8')
-    # Servir inline (o navegador pode abrir ou oferecer opção) — semelhante ao comportamento do boletim
-    response['Content-Disposition'] = 'inline; filename="relatorio_presencas.csv"'
-    return response
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_frequencia_csv', {'turma_id': None})
+    return _csv_frequencia(None, 'relatorio_presencas.csv')
 
 
 def relatorio_select(request):
@@ -91,7 +211,7 @@ def relatorio_select(request):
     # Página para selecionar a turma antes de gerar relatórios
     turmas = Turmas.objects.all()
     from django.shortcuts import render
-    return render(request, 'relatorio_select.html', {'turmas': turmas})
+    return render(request, 'relatorio_select.html', {'turmas': turmas, 'bimestres': [1, 2, 3, 4]})
 
 
 def gerar_relatorio_presenca_excel_turma(request, turma_id):
@@ -102,34 +222,15 @@ def gerar_relatorio_presenca_excel_turma(request, turma_id):
     - turma_id: int (pk da turma)
 
     Saída:
-    - HttpResponse com CSV (utf-8-sig) servido inline.
+    - StreamingHttpResponse com CSV (BOM UTF-8) servido inline.
 
     Observações:
-    - Filtra faltas pela turma antes de agregar por aluno.
+    - Usa `agregar_frequencia(turma_id)`, que filtra pela turma antes de
+      agregar por aluno.
     """
-    import csv
-    header = ["Aluno", "Presenças", "Faltas", "% Presença", "Situação"]
-    rows = []
-    alunos = Falta.objects.filter(turma_id=turma_id).values('aluno__complet_name_aluno').distinct()
-    for aluno in alunos:
-        nome = aluno['aluno__complet_name_aluno']
-        total_presencas = Falta.objects.filter(turma_id=turma_id, aluno__complet_name_aluno=nome, status='P').count()
-        total_faltas = Falta.objects.filter(turma_id=turma_id, aluno__complet_name_aluno=nome, status='F').count()
-        total_aulas = total_presencas + total_faltas
-        porcentagem = (total_presencas / total_aulas * 100) if total_aulas > 0 else 0
-        status = "Aprovado" if porcentagem >= 80 else "Reprovado"
-        rows.append([nome, total_presencas, total_faltas, f"{porcentagem:.1f}%", status])
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(header)
-    for r in rows:
-        writer.writerow(r)
-
-    csv_data = output.getvalue().encode('utf-8-sig')
-    response = HttpResponse(csv_data, content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'inline; filename="relatorio_presencas_turma_{turma_id}.csv"'
-    return response
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_frequencia_csv', {'turma_id': turma_id})
+    return _csv_frequencia(turma_id, f'relatorio_presencas_turma_{turma_id}.csv')
 
 
 def gerar_relatorio_presenca_pdf_turma(request, turma_id):
@@ -147,73 +248,69 @@ def gerar_relatorio_presenca_pdf_turma(request, turma_id):
       com TableStyle. Para relatórios mais ricos, considere gerar HTML e usar
       WeasyPrint (como em outros relatórios do projeto).
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elementos = [Paragraph("Relatório de Faltas e Presenças", styles['Title']), Spacer(1, 12)]
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_frequencia_pdf', {'turma_id': turma_id})
+    return _pdf_frequencia(turma_id, f'relatorio_presencas_turma_{turma_id}.pdf')
 
-    dados_tabela = [["Aluno", "Presenças", "Faltas", "% Presença", "Situação"]]
-    alunos = Falta.objects.filter(turma_id=turma_id).values('aluno__complet_name_aluno').distinct()
-    for aluno in alunos:
-        nome = aluno['aluno__complet_name_aluno']
-        total_presencas = Falta.objects.filter(turma_id=turma_id, aluno__complet_name_aluno=nome, status='P').count()
-        total_faltas = Falta.objects.filter(turma_id=turma_id, aluno__complet_name_aluno=nome, status='F').count()
-        total_aulas = total_presencas + total_faltas
-        porcentagem = (total_presencas / total_aulas * 100) if total_aulas > 0 else 0
-        status = "Aprovado" if porcentagem >= 80 else "Reprovado"
-        dados_tabela.append([nome, total_presencas, total_faltas, f"{porcentagem:.1f}%", status])
 
-    tabela = Table(dados_tabela, repeatRows=1)
-    tabela.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    elementos.append(tabela)
-    doc.build(elementos)
+def gerar_relatorio_presenca_pdf(request):
+    """Gera PDF do relatório de presenças/faltas para todas as turmas.
 
-    buffer.seek(0)
-    response = FileResponse(buffer, as_attachment=False, filename=f"relatorio_presencas_turma_{turma_id}.pdf")
-    response['Content-Disposition'] = f'inline; filename="relatorio_presencas_turma_{turma_id}.pdf"'
-    return response
+    Sem argumentos de turma; agrupa por aluno em todo o colégio. Com
+    ?async=1 o relatório é gerado em segundo plano (resposta 202 com o
+    endereço de acompanhamento do job).
+    """
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_frequencia_pdf', {'turma_id': None})
+    return _pdf_frequencia(None, 'relatorio_presencas.pdf')
 
 
-def gerar_relatorio_presenca_pdf(request):
-    """Gera PDF do relatório de presenças/faltas para todas as turmas.
+def csv_notas_turma(turma_id, bimestre, ano=None):
+    """Partes do CSV de notas da turma no bimestre: uma linha por aluno,
+    uma coluna por disciplina e a média do aluno no bimestre.
 
-    Sem argumentos de turma; agrupa por aluno em todo o colégio.
+    As notas são lidas ordenadas por aluno com `.iterator(chunk_size=...)` e
+    agrupadas à medida que chegam, sem carregar a turma inteira.
     """
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elementos = [Paragraph("Relatório de Faltas e Presenças", styles['Title']), Spacer(1, 12)]
-    
-    dados_tabela = [["Aluno", "Presenças", "Faltas", "% Presença", "Situação"]]
-    
-    alunos = Falta.objects.values('aluno__complet_name_aluno').distinct()
-    for aluno in alunos:
-        nome = aluno['aluno__complet_name_aluno']
-        total_presencas = Falta.objects.filter(aluno__complet_name_aluno=nome, status='P').count()
-        total_faltas = Falta.objects.filter(aluno__complet_name_aluno=nome, status='F').count()
-        total_aulas = total_presencas + total_faltas
-        porcentagem = (total_presencas / total_aulas * 100) if total_aulas > 0 else 0
-        status = "Aprovado" if porcentagem >= 80 else "Reprovado"
-        dados_tabela.append([nome, total_presencas, total_faltas, f"{porcentagem:.1f}%", status])
-    
-    tabela = Table(dados_tabela, repeatRows=1)
-    tabela.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    
-    elementos.append(tabela)
-    doc.build(elementos)
-    
-    buffer.seek(0)
-    response = FileResponse(buffer, as_attachment=False, filename="relatorio_presencas.pdf")
-    # Forçar exibição inline no navegador (como feito em boletim_aluno_pdf)
-    response['Content-Disposition'] = 'inline; filename="relatorio_presencas.pdf"'
-    return response
+    materias = list(Materia.objects.order_by('name_subject').values_list('id', 'name_subject'))
+    cabecalho = ["Aluno"] + [nome for _, nome in materias] + ["Média"]
+
+    notas = Nota.objects.filter(aluno__class_choices_id=turma_id, bimestre=bimestre)
+    if ano is not None:
+        notas = notas.filter(data_lancamento__range=intervalo_ano_letivo(ano))
+    notas = (
+        notas
+        .order_by('aluno__complet_name_aluno', 'aluno_id')
+        .values_list('aluno_id', 'aluno__complet_name_aluno', 'materia_id', 'nota')
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+
+    def linhas():
+        for (_, nome), notas_aluno in groupby(notas, key=lambda n: (n[0], n[1])):
+            por_materia = {materia_id: nota for _, _, materia_id, nota in notas_aluno}
+            media = sum(por_materia.values()) / len(por_materia)
+            yield [nome] + [por_materia.get(materia_id, '') for materia_id, _ in materias] + [f"{media:.2f}"]
+
+    return partes_csv(cabecalho, linhas())
+
+
+def gerar_relatorio_notas_csv_turma(request, turma_id, bimestre):
+    """Exporta as notas de uma turma em um bimestre como CSV.
+
+    Entrada:
+    - request: HttpRequest
+    - turma_id: int (pk da turma)
+    - bimestre: int (1 a 4)
+    - ?ano=AAAA (opcional): considera só as notas lançadas naquele ano letivo
+    - ?async=1 (opcional): gera em segundo plano (ver `csv_notas_turma`)
+
+    Saída:
+    - StreamingHttpResponse com CSV (BOM UTF-8) servido inline, ou 202 com
+      o endereço de acompanhamento do job.
+    """
+    turma = get_object_or_404(Turmas, id=turma_id)
+    ano = request.GET.get('ano')
+    ano = int(ano) if ano and ano.isdigit() else None
+    if pedido_assincrono(request):
+        return resposta_job(request, 'relatorio_notas_csv', {'turma_id': turma.id, 'bimestre': bimestre, 'ano': ano})
+    return _csv_streaming(csv_notas_turma(turma.id, bimestre, ano), f'notas_turma_{turma.id}_bimestre_{bimestre}.csv')